@@ -1,9 +1,21 @@
 import math
+import argparse
+import time
+import timeit
+import tracemalloc
+
+import numpy as np
 
 class IVector:
+    __slots__ = ()
+
     def getComponents(self):
         pass
 
+    def getFlatComponents(self):
+        # Krotka współrzędnych liczona raz i trzymana do zmiany wektora; łańcuchy opakowań zwracają jedną płaską krotkę
+        return tuple(self.getComponents())
+
     def abs(self):
         pass
 
@@ -12,22 +24,46 @@ class IVector:
  
 class Vector2D(IVector):
     def __init__(self, x, y):
-        self.x = x
-        self.y = y
+        self._x = x
+        self._y = y
+        self._flat = None
+
+    @property
+    def x(self):
+        return self._x
+
+    @x.setter
+    def x(self, value):
+        self._x = value
+        self._flat = None
+
+    @property
+    def y(self):
+        return self._y
+
+    @y.setter
+    def y(self, value):
+        self._y = value
+        self._flat = None
 
     def getComponents(self):
-        return [self.x, self.y]
+        return [self._x, self._y]
+
+    def getFlatComponents(self):
+        if self._flat is None:
+            self._flat = (self._x, self._y)
+        return self._flat
 
     def abs(self):
-        return math.sqrt(self.x ** 2 + self.y **2)
+        return math.sqrt(self._x ** 2 + self._y **2)
     
     def cdot(self, ivector):
-        values = ivector.getComponents()
-        return self.x * values[0] + self.y * values[1]
+        values = ivector.getFlatComponents()
+        return self._x * values[0] + self._y * values[1]
     
 class Polar2DInheritance(Vector2D):
     def getAngle(self):
-        return math.atan2(self.y, self.x)
+        return math.atan2(self._y, self._x)
 
 class Polar2DAdapter(IVector):
     def __init__(self, srcVector):
@@ -42,30 +78,52 @@ class Polar2DAdapter(IVector):
     def getComponents(self):
         return self.srcVector.getComponents()
 
+    def getFlatComponents(self):
+        return self.srcVector.getFlatComponents()
+
     def getAngle(self):
-        components = self.srcVector.getComponents()
+        components = self.srcVector.getFlatComponents()
         return math.atan2(components[1], components[0])
 
 class Vector3DDecorator(IVector):
     def __init__(self, vector, z=0):
         self.vector = vector
-        self.z = z
+        self._z = z
+        self._flat = None
+        self._wrapped = None
+
+    @property
+    def z(self):
+        return self._z
+
+    @z.setter
+    def z(self, value):
+        self._z = value
+        self._flat = None
 
     def abs(self):
-        components = self.getComponents()
+        components = self.getFlatComponents()
         return math.sqrt(components[0]**2 + components[1]**2 + components[2]**2)
 
     def cdot(self, ivector):
-        components1 = self.getComponents()
-        components2 = ivector.getComponents()
+        components1 = self.getFlatComponents()
+        components2 = ivector.getFlatComponents()
         return components1[0] * components2[0] + components1[1] * components2[1] + components1[2] * components2[2]
 
     def getComponents(self):
-        return self.vector.getComponents() + [self.z]
+        return list(self.getFlatComponents())
+
+    def getFlatComponents(self):
+        # Zmiana opakowanego wektora daje nową krotkę, więc wystarczy porównać ją przez `is`
+        wrapped = self.vector.getFlatComponents()
+        if self._flat is None or wrapped is not self._wrapped:
+            self._wrapped = wrapped
+            self._flat = wrapped + (self._z,)
+        return self._flat
 
     def cross(self, ivector):
-        components1 = self.getComponents()
-        components2 = ivector.getComponents()
+        components1 = self.getFlatComponents()
+        components2 = ivector.getFlatComponents()
         x = components1[1] * components2[2] - components1[2] * components2[1]
         y = components1[2] * components2[0] - components1[0] * components2[2]
         z = components1[0] * components2[1] - components1[1] * components2[0]
@@ -77,49 +135,386 @@ class Vector3DDecorator(IVector):
 class Vector3DInheritance(Vector2D):
     def __init__(self, x, y, z=0):
         super().__init__(x, y)
-        self.z = z
+        self._z = z
+
+    @property
+    def z(self):
+        return self._z
+
+    @z.setter
+    def z(self, value):
+        self._z = value
+        self._flat = None
 
     def abs(self):
-        return math.sqrt(self.x ** 2 + self.y ** 2 + self.z ** 2)
+        return math.sqrt(self._x ** 2 + self._y ** 2 + self._z ** 2)
     
     def cdot(self, Ivector):
-        return self.x * Ivector.x + self.y * Ivector.y + self.z * Ivector.z
+        if type(Ivector) is Vector3DInheritance:
+            return self._x * Ivector._x + self._y * Ivector._y + self._z * Ivector._z
+        x, y, z = Ivector.getFlatComponents()
+        return self._x * x + self._y * y + self._z * z
     
     def getComponents(self):
-        return [self.x, self.y, self.z]
+        return [self._x, self._y, self._z]
+
+    def getFlatComponents(self):
+        if self._flat is None:
+            self._flat = (self._x, self._y, self._z)
+        return self._flat
 
     def cross(self, IVector):
-        x = self.y * IVector.z - self.z * IVector.y
-        y = self.z * IVector.x - self.x * IVector.z
-        z = self.x * IVector.y - self.y * IVector.x
+        if type(IVector) is Vector3DInheritance:
+            ix, iy, iz = IVector._x, IVector._y, IVector._z
+        else:
+            ix, iy, iz = IVector.getFlatComponents()
+        x = self._y * iz - self._z * iy
+        y = self._z * ix - self._x * iz
+        z = self._x * iy - self._y * ix
         return [x, y, z]
     
     def getSrcV(self):
         return self
-    
 
- # Utworzenie trzech przykładowych wektorów
 
-vectorA = Polar2DAdapter(Vector2D(4, 4))
-vectorB = Vector3DDecorator(Vector2D(2, 1), 5)
-vectorC = Vector3DDecorator(Vector2D(3, 7), 4)
+class CompactVector2D(IVector):
+    """Wektor 2D bez słownika atrybutów: same dwa pola w __slots__, bez pamięci podręcznej współrzędnych."""
+    __slots__ = ("x", "y")
+
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+    def getComponents(self):
+        return [self.x, self.y]
+
+    def getFlatComponents(self):
+        return (self.x, self.y)
+
+    def abs(self):
+        return math.sqrt(self.x ** 2 + self.y ** 2)
+
+    def cdot(self, ivector):
+        values = ivector.getFlatComponents()
+        return self.x * values[0] + self.y * values[1]
+
+    def getAngle(self):
+        return math.atan2(self.y, self.x)
+
+
+class CompactVector3D(IVector):
+    """Wektor 3D bez słownika atrybutów; zastępuje Vector3DDecorator i Vector3DInheritance tam, gdzie liczy się pamięć."""
+    __slots__ = ("x", "y", "z")
+
+    def __init__(self, x, y, z=0):
+        self.x = x
+        self.y = y
+        self.z = z
+
+    @classmethod
+    def fromVector(cls, ivector):
+        components = ivector.getFlatComponents()
+        return cls(components[0], components[1], components[2] if len(components) > 2 else 0)
+
+    def getComponents(self):
+        return [self.x, self.y, self.z]
+
+    def getFlatComponents(self):
+        return (self.x, self.y, self.z)
+
+    def abs(self):
+        return math.sqrt(self.x ** 2 + self.y ** 2 + self.z ** 2)
+
+    def cdot(self, ivector):
+        x, y, z = ivector.getFlatComponents()
+        return self.x * x + self.y * y + self.z * z
+
+    def cross(self, ivector):
+        ix, iy, iz = ivector.getFlatComponents()
+        x = self.y * iz - self.z * iy
+        y = self.z * ix - self.x * iz
+        z = self.x * iy - self.y * ix
+        return [x, y, z]
+
+    def getSrcV(self):
+        return self
+
+
+class VectorArray:
+    """N wektorów 2D albo 3D w jednej ciągłej tablicy NumPy o kształcie (N, 2) lub (N, 3).
+
+    Operacje liczone są dla wszystkich wektorów naraz zamiast wywołań metod na każdym obiekcie.
+    """
+
+    def __init__(self, components):
+        self.components = np.ascontiguousarray(components, dtype=np.float64)
+        if self.components.ndim != 2 or self.components.shape[1] not in (2, 3):
+            raise ValueError("Oczekiwano tablicy o kształcie (N, 2) lub (N, 3)")
+
+    @classmethod
+    def fromVectors(cls, vectors, dim=None):
+        # Wektory 2D dołączone do wektorów 3D dostają z = 0, tak jak w Vector3DDecorator
+        rows = [vector.getFlatComponents() for vector in vectors]
+        lengths = {len(row) for row in rows}
+        dim = dim or max(lengths, default=2)
+        if lengths == {dim}:
+            return cls(rows)
+        components = np.zeros((len(rows), dim))
+        for i, row in enumerate(rows):
+            components[i, :len(row)] = row
+        return cls(components)
+
+    def toVectors(self):
+        if self.dim == 2:
+            return [Vector2D(x, y) for x, y in self.components.tolist()]
+        return [Vector3DInheritance(x, y, z) for x, y, z in self.components.tolist()]
+
+    @property
+    def dim(self):
+        return self.components.shape[1]
+
+    def __len__(self):
+        return len(self.components)
+
+    def __getitem__(self, index):
+        # Wycinki, maski i tablice indeksów dają nową VectorArray, pojedynczy indeks daje wektor
+        if not isinstance(index, (int, np.integer)):
+            return VectorArray(self.components[index])
+        row = self.components[index].tolist()
+        return Vector2D(*row) if self.dim == 2 else Vector3DInheritance(*row)
+
+    def getComponents(self):
+        return self.components
+
+    def _as3D(self):
+        if self.dim == 3:
+            return self.components
+        return np.column_stack([self.components, np.zeros(len(self))])
+
+    @staticmethod
+    def _other(ivector):
+        # Pojedynczy wektor IVector jest rozgłaszany na wszystkie wiersze
+        if isinstance(ivector, VectorArray):
+            return ivector
+        return VectorArray(np.asarray(ivector.getComponents(), dtype=np.float64).reshape(1, -1))
+
+    def _aligned(self, ivector):
+        other = self._other(ivector)
+        if self.dim == other.dim:
+            return self.components, other.components
+        return self._as3D(), other._as3D()
+
+    def abs(self):
+        return np.sqrt(np.einsum("ij,ij->i", self.components, self.components))
+
+    def cdot(self, ivector):
+        """Iloczyny skalarne odpowiadających sobie wektorów (albo każdego wektora z jednym IVector)."""
+        a, b = self._aligned(ivector)
+        if len(b) == 1:
+            return a @ b[0]
+        return np.einsum("ij,ij->i", a, b)
+
+    def pairwiseCdot(self, ivector):
+        """Macierz iloczynów skalarnych każdego wektora z każdym wektorem drugiej tablicy."""
+        a, b = self._aligned(ivector)
+        return a @ b.T
+
+    def cross(self, ivector):
+        return VectorArray(np.cross(self._as3D(), self._other(ivector)._as3D()))
+
+    def getAngle(self):
+        return np.arctan2(self.components[:, 1], self.components[:, 0])
+
+
+# Dawne wersje operacji, które przy każdym wywołaniu budują nowe listy współrzędnych (do porównania w benchmarku);
+# pola czytane są bezpośrednio, tak jak dawniej zwykłe atrybuty x, y, z
+def _legacyComponents(vector):
+    if isinstance(vector, Polar2DAdapter):
+        return _legacyComponents(vector.srcVector)
+    if isinstance(vector, Vector3DDecorator):
+        return _legacyComponents(vector.vector) + [vector._z]
+    return vector.getComponents()
+
+
+def _legacy2DCdot(vector, ivector):
+    values = _legacyComponents(ivector)
+    return vector._x * values[0] + vector._y * values[1]
+
+
+def _legacyDecoratorAbs(vector):
+    components = _legacyComponents(vector)
+    return math.sqrt(components[0]**2 + components[1]**2 + components[2]**2)
+
+
+def _legacyDecoratorCdot(vector, ivector):
+    components1 = _legacyComponents(vector)
+    components2 = _legacyComponents(ivector)
+    return components1[0] * components2[0] + components1[1] * components2[1] + components1[2] * components2[2]
+
+
+def _legacyDecoratorCross(vector, ivector):
+    components1 = _legacyComponents(vector)
+    components2 = _legacyComponents(ivector)
+    x = components1[1] * components2[2] - components1[2] * components2[1]
+    y = components1[2] * components2[0] - components1[0] * components2[2]
+    z = components1[0] * components2[1] - components1[1] * components2[0]
+    return [x, y, z]
+
+
+def _legacy3DCdot(vector, ivector):
+    return vector._x * ivector._x + vector._y * ivector._y + vector._z * ivector._z
+
+
+def _legacy3DCross(vector, ivector):
+    x = vector._y * ivector._z - vector._z * ivector._y
+    y = vector._z * ivector._x - vector._x * ivector._z
+    z = vector._x * ivector._y - vector._y * ivector._x
+    return [x, y, z]
+
+
+def _peakBytes(operation, repeats=1000):
+    # Średni szczyt pamięci zajętej w trakcie jednej operacji (listy tymczasowe, wynik)
+    tracemalloc.start()
+    total = 0
+    for _ in range(repeats):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        operation()
+        total += tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    return total / repeats
+
+
+def benchmarkComponents(operations=200000):
+    plane = Vector2D(3, 4)
+    adapter = Polar2DAdapter(Vector2D(3, 4))
+    decorator = Vector3DDecorator(Vector2D(3, 4), 5)
+    chain = Polar2DAdapter(Vector3DDecorator(Vector2D(3, 4), 5))
+    solid = Vector3DInheritance(3, 4, 5)
+    other = Vector3DDecorator(Vector2D(1, 2), 3)
+    otherSolid = Vector3DInheritance(1, 2, 3)
+    # abs w Vector2D, Polar2DAdapter i Vector3DInheritance nie korzystał z list, więc dawna wersja to ta sama metoda
+    cases = [
+        ("Vector2D", [
+            ("abs", plane.abs, plane.abs),
+            ("cdot", lambda: _legacy2DCdot(plane, other), lambda: plane.cdot(other)),
+        ]),
+        ("Polar2DAdapter", [
+            ("abs", adapter.abs, adapter.abs),
+            ("cdot", lambda: _legacy2DCdot(adapter.srcVector, other), lambda: adapter.cdot(other)),
+        ]),
+        ("Vector3DDecorator", [
+            ("abs", lambda: _legacyDecoratorAbs(decorator), decorator.abs),
+            ("cdot", lambda: _legacyDecoratorCdot(decorator, other), lambda: decorator.cdot(other)),
+            ("cross", lambda: _legacyDecoratorCross(decorator, other), lambda: decorator.cross(other)),
+        ]),
+        ("Adapter(Decorator)", [
+            ("abs", lambda: _legacyDecoratorAbs(chain.srcVector), chain.abs),
+            ("cdot", lambda: _legacyDecoratorCdot(chain.srcVector, other), lambda: chain.cdot(other)),
+        ]),
+        ("Vector3DInheritance", [
+            ("abs", solid.abs, solid.abs),
+            ("cdot", lambda: _legacy3DCdot(solid, otherSolid), lambda: solid.cdot(otherSolid)),
+            ("cross", lambda: _legacy3DCross(solid, otherSolid), lambda: solid.cross(otherSolid)),
+        ]),
+    ]
+    print(f"{'klasa':<20} {'operacja':<8} {'dawniej ns':>10} {'teraz ns':>10} {'dawniej B':>10} {'teraz B':>10}")
+    for name, pairs in cases:
+        for operation, legacy, current in pairs:
+            if legacy() != current():
+                raise AssertionError(f"{name}.{operation}: różne wyniki")
+            legacyTime = timeit.timeit(legacy, number=operations) / operations * 1e9
+            currentTime = timeit.timeit(current, number=operations) / operations * 1e9
+            print(f"{name:<20} {operation:<8} {legacyTime:>10.1f} {currentTime:>10.1f} "
+                  f"{_peakBytes(legacy):>10.0f} {_peakBytes(current):>10.0f}")
+
+
+def benchmarkVectorMemory(count=1000000):
+    factories = [
+        ("Vector2D", lambda i: Vector2D(i * 0.5, i * 0.25)),
+        ("CompactVector2D", lambda i: CompactVector2D(i * 0.5, i * 0.25)),
+        ("Vector3DDecorator", lambda i: Vector3DDecorator(Vector2D(i * 0.5, i * 0.25), i * 0.125)),
+        ("Vector3DInheritance", lambda i: Vector3DInheritance(i * 0.5, i * 0.25, i * 0.125)),
+        ("CompactVector3D", lambda i: CompactVector3D(i * 0.5, i * 0.25, i * 0.125)),
+    ]
+    other = CompactVector3D(1.0, 2.0, 3.0)
+    print(f"{'klasa':<20} {'B na wektor':>12} {'MiB':>8} {'abs/s':>12} {'cdot/s':>12}")
+    for name, factory in factories:
+        tracemalloc.start()
+        vectors = [factory(i) for i in range(count)]
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        # Wspólny wektor innej klasy w cdot sprawdza też współpracę klas
+        start = time.perf_counter()
+        for vector in vectors:
+            vector.abs()
+        absRate = count / (time.perf_counter() - start)
+        start = time.perf_counter()
+        for vector in vectors:
+            vector.cdot(other)
+        cdotRate = count / (time.perf_counter() - start)
+        print(f"{name:<20} {size / count:>12.1f} {size / 2 ** 20:>8.1f} {absRate:>12.0f} {cdotRate:>12.0f}")
+        del vectors
+
+    tracemalloc.start()
+    array = VectorArray(np.arange(count * 3, dtype=np.float64).reshape(count, 3))
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    start = time.perf_counter()
+    array.abs()
+    absRate = count / (time.perf_counter() - start)
+    start = time.perf_counter()
+    array.cdot(other)
+    cdotRate = count / (time.perf_counter() - start)
+    print(f"{'VectorArray (N, 3)':<20} {size / count:>12.1f} {size / 2 ** 20:>8.1f} {absRate:>12.0f} {cdotRate:>12.0f}")
+
+
+def demo():
+    # Utworzenie trzech przykładowych wektorów
+
+    vectorA = Polar2DAdapter(Vector2D(4, 4))
+    vectorB = Vector3DDecorator(Vector2D(2, 1), 5)
+    vectorC = Vector3DDecorator(Vector2D(3, 7), 4)
+
+    print("\nWspółrzędne w układzie kartezjańsim:")
+    print("1. Wektor A -", vectorA.getComponents())
+    print("2. Wektor B -", vectorB.getComponents())
+    print("3. Wektor C -", vectorC.getComponents())
+
+    print("\nWspółrzędne biegunowe dla Wektora A")
+    print("Długość:", vectorA.abs())
+    print("Kąt: ", vectorA.getAngle())
+
+    print("\nIloczyny skalarne")
+    print("Wektor A ⋅ wektor B:", vectorA.cdot(vectorB))
+    print("Wektor B ⋅ wektor C:", vectorB.cdot(vectorC))
+    print("Wektor C ⋅ wektor A:", vectorA.cdot(vectorC))
 
-print("\nWspółrzędne w układzie kartezjańsim:")
-print("1. Wektor A -", vectorA.getComponents())
-print("2. Wektor B -", vectorB.getComponents())
-print("3. Wektor C -", vectorC.getComponents())
+    print("\nIloczyny wektorowe (w formie współrzędnych kartezjańskich)")
+    vectorA3d = Vector3DDecorator(Vector2D(4, 4), 0)
+    print("Wektor A x wektor B:", vectorA3d.cross(vectorB))
+    print("Wektor B x wektor C:", vectorB.cross(vectorC))
+    print("Wektor C x wektor A:", vectorA3d.cross(vectorC))
 
-print("\nWspółrzędne biegunowe dla Wektora A")
-print("Długość:", vectorA.abs())
-print("Kąt: ", vectorA.getAngle())
+    print("\nTe same działania dla wszystkich wektorów naraz (VectorArray)")
+    vectors = VectorArray.fromVectors([vectorA, vectorB, vectorC])
+    print("Długości:", vectors.abs())
+    print("Iloczyny skalarne z wektorem B:", vectors.cdot(vectorB))
+    print("Iloczyny wektorowe z wektorem C:", vectors.cross(vectorC).getComponents().tolist())
 
-print("\nIloczyny skalarne")
-print("Wektor A ⋅ wektor B:", vectorA.cdot(vectorB))
-print("Wektor B ⋅ wektor C:", vectorB.cdot(vectorC))
-print("Wektor C ⋅ wektor A:", vectorA.cdot(vectorC))
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Wektory 2D i 3D")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="porównaj czas i pamięć operacji na listach współrzędnych z wersją na krotkach w pamięci podręcznej")
+    parser.add_argument("--bench-memory", action="store_true",
+                        help="porównaj pamięć i szybkość zwykłych wektorów z CompactVector2D, CompactVector3D i VectorArray")
+    parser.add_argument("--count", type=int, default=1000000, help="liczba wektorów w benchmarku pamięci")
+    parser.add_argument("--operations", type=int, default=200000, help="liczba powtórzeń każdej operacji w benchmarku")
+    args = parser.parse_args()
 
-print("\nIloczyny wektorowe (w formie współrzędnych kartezjańskich)")
-vectorA3d = Vector3DDecorator(Vector2D(4, 4), 0)
-print("Wektor A x wektor B:", vectorA3d.cross(vectorB))
-print("Wektor B x wektor C:", vectorB.cross(vectorC))
-print("Wektor C x wektor A:", vectorA3d.cross(vectorC))
\ No newline at end of file
+    if args.benchmark:
+        benchmarkComponents(args.operations)
+    elif args.bench_memory:
+        benchmarkVectorMemory(args.count)
+    else:
+        demo()
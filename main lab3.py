@@ -1,17 +1,37 @@
+import csv
 import math
 import json
+import os
+import time
 import random
+import argparse
+import itertools
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.animation import FuncAnimation
 from abc import ABC, abstractmethod
 import matplotlib
 
-matplotlib.use('TkAgg')
+
+# Oba silniki zapisują stan w .npz, ale w różnym układzie, więc mają osobne pliki i znacznik "engine"
+OBJECTS_CHECKPOINT = "state_objects.npz"
+NUMPY_CHECKPOINT = "state_numpy.npz"
+
+
+def checkpoint_engine(data):
+    if "engine" in data.files:
+        return str(data["engine"])
+    # Pliki sprzed dodania znacznika: tylko silnik obiektowy zapisywał stan modułu random
+    return "objects" if "random_state" in data.files else "numpy"
 
 
 class FileHandling:
     def save_to_file(self, population, filename="state.json"):
-        data = [p.to_dict() for p in population if not p.zniknięty]
+        self.save_records([p.to_dict() for p in population if not p.zniknięty], filename)
+
+    def save_records(self, data, filename="state.json"):
         with open(filename, "w") as file:
             json.dump(data, file)
         print(f"Stan zapisany do pliku {filename}.")
@@ -29,17 +49,159 @@ class FileHandling:
             print(f"Błąd podczas odczytu pliku: {e}")
             return []
 
+    def save_checkpoint(self, population, filename=OBJECTS_CHECKPOINT, contact_tracker=None, wymiary=None,
+                        liczba_osobników=None):
+        engine = VectorizedPopulation.from_population(population, wymiary, liczba_osobników)
+        if contact_tracker is not None:
+            engine.contacts = contact_tracker
+        arrays = engine.checkpoint_arrays()
+        version, internal_state, gauss_next = random.getstate()
+        arrays["random_version"] = np.array(version)
+        arrays["random_state"] = np.array(internal_state, dtype=np.uint64)
+        arrays["random_gauss_next"] = np.array(np.nan if gauss_next is None else gauss_next)
+        arrays["engine"] = np.array("objects")
+        np.savez(filename, **arrays)
+        print(f"Stan zapisany do pliku {filename}.")
+
+    def restore_checkpoint(self, filename=OBJECTS_CHECKPOINT):
+        """Przywraca populację, liczniki kontaktów i stan modułu random; zwraca (populacja, contact_tracker).
+
+        Gdy pliku nie ma albo zapisał go inny silnik, zwraca None, a bieżący stan zostaje bez zmian.
+        """
+        try:
+            with np.load(filename) as data:
+                if checkpoint_engine(data) != "objects":
+                    print(f"Plik {filename} zawiera stan silnika {checkpoint_engine(data)}, a nie objects.")
+                    return None
+                engine = VectorizedPopulation.from_checkpoint_arrays(data)
+                gauss_next = float(data["random_gauss_next"])
+                random_state = (
+                    int(data["random_version"]),
+                    tuple(int(v) for v in data["random_state"]),
+                    None if math.isnan(gauss_next) else gauss_next,
+                )
+        except FileNotFoundError:
+            print(f"Plik {filename} nie istnieje.")
+            return None
+        except Exception as e:
+            print(f"Błąd podczas odczytu pliku: {e}")
+            return None
+        # Osoby odtwarzane są przed przywróceniem stanu random, bo konstruktory losują prędkość i czas zakażenia
+        population = engine.to_population()
+        random.setstate(random_state)
+        print(f"Stan przywrócony z pliku {filename}.")
+        return population, engine.contacts
+
     @staticmethod
     def create_person_from_dict(data):
         if data["type"] == "Healthy":
-            return Healthy(data["x"], data["y"], data["id"])
+            person = Healthy(data["x"], data["y"], data["id"])
         elif data["type"] == "Infected":
             person = Infected(data["x"], data["y"], data["id"])
             person.czas_zakażenia = data["czas_zakażenia"]
             person.objawy = data["objawy"]
-            return person
+            if "max_czas_zakażenia" in data:
+                person.max_czas_zakażenia = data["max_czas_zakażenia"]
         elif data["type"] == "Immune":
-            return Immune(data["x"], data["y"], data["id"])
+            person = Immune(data["x"], data["y"], data["id"])
+        # Starsze zapisy nie zawierają prędkości; wtedy zostaje wylosowana nowa
+        if "vx" in data:
+            person.velocity = Vector2D(data["vx"], data["vy"])
+        return person
+
+
+INFECTION_RADIUS = 2
+
+
+def _max_squared_distance(radius):
+    # Największy kwadrat odległości, dla którego math.sqrt daje jeszcze wynik <= radius,
+    # dzięki temu porównanie kwadratów wykrywa dokładnie te same kontakty co distance_to
+    limit = float(radius) ** 2
+    while math.sqrt(math.nextafter(limit, math.inf)) <= radius:
+        limit = math.nextafter(limit, math.inf)
+    return limit
+
+
+INFECTION_RADIUS_SQ = _max_squared_distance(INFECTION_RADIUS)
+# Minimalny zapas ponad promień zakażenia na błędy zaokrągleń przy wyznaczaniu komórek
+GRID_CELL_SIZE = INFECTION_RADIUS * (1 + 1e-9)
+
+
+class SpatialGrid:
+    """Siatka komórek o boku równym promieniowi zakażenia, indeksowana pozycją osoby w populacji."""
+
+    def __init__(self, cell_size=GRID_CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.cell_of = {}
+
+    def _cell(self, x, y):
+        return math.floor(x / self.cell_size), math.floor(y / self.cell_size)
+
+    def insert(self, index, x, y):
+        cell = self._cell(x, y)
+        self.cells.setdefault(cell, set()).add(index)
+        self.cell_of[index] = cell
+
+    def remove(self, index):
+        cell = self.cell_of.pop(index)
+        members = self.cells[cell]
+        members.discard(index)
+        if not members:
+            del self.cells[cell]
+
+    def move(self, index, x, y):
+        cell = self._cell(x, y)
+        if self.cell_of[index] != cell:
+            self.remove(index)
+            self.cells.setdefault(cell, set()).add(index)
+            self.cell_of[index] = cell
+
+    def __contains__(self, index):
+        return index in self.cell_of
+
+    def nearby(self, x, y):
+        cx, cy = self._cell(x, y)
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                members = self.cells.get((cx + dx, cy + dy))
+                if members:
+                    yield from members
+
+
+class ContactTracker:
+    """Czas trwania kontaktu (w klatkach) dla par (id zdrowego, id zakażonego), które są teraz w zasięgu.
+
+    Słownik żyje między krokami symulacji, ale trzyma tylko pary potwierdzone w ostatnim kroku:
+    para, która się rozeszła albo której uczestnik zniknął, wypada przy najbliższym end_step/update.
+    """
+
+    def __init__(self):
+        self.durations = {}
+        self._current = {}
+
+    def __len__(self):
+        return len(self.durations)
+
+    def begin_step(self):
+        self._current = {}
+
+    def touch(self, healthy_id, infected_id):
+        pair = (healthy_id, infected_id)
+        duration = self.durations.get(pair, 0) + 1
+        self._current[pair] = duration
+        return duration
+
+    def end_step(self):
+        self.durations = self._current
+        self._current = {}
+
+    def update(self, healthy_ids, infected_ids):
+        """Zbiorcza aktualizacja z wyniku zapytania o sąsiadów; zwraca czasy kontaktu w tej samej kolejności."""
+        self.begin_step()
+        durations = [self.touch(healthy_id, infected_id) for healthy_id, infected_id in zip(healthy_ids, infected_ids)]
+        self.end_step()
+        return durations
 
 
 class Vector2D:
@@ -94,6 +256,8 @@ class Person(ABC):
             "y": self.y,
             "id": self.id,
             "type": self.__class__.__name__,
+            "vx": self.velocity.x,
+            "vy": self.velocity.y,
         }
 
 
@@ -119,7 +283,8 @@ class Infected(Person):
         data = super().to_dict()
         data.update({
             "czas_zakażenia": self.czas_zakażenia,
-            "objawy": self.objawy
+            "objawy": self.objawy,
+            "max_czas_zakażenia": self.max_czas_zakażenia,
         })
         return data
 
@@ -164,68 +329,1024 @@ def add_new_person(grid_size, id):
         return Healthy(x, y, id)
 
 
-def update_population(population, grid_size, liczba_osobników):
+def update_population(population, grid_size, liczba_osobników, contact_tracker=None, profiler=None):
     new_population = []
-    contact_tracker = {}
+    if contact_tracker is None:
+        contact_tracker = ContactTracker()
+    contact_tracker.begin_step()
+    if profiler is not None:
+        profiler.begin_step()
+        started = time.perf_counter()
+    distance_checks = contacts = infections = 0
+
+    # Zakażeni są w siatce na bieżących pozycjach: przesuwają się w niej razem z ruchem w pętli poniżej,
+    # więc zdrowy widzi ich dokładnie tam, gdzie widziałby ich przy sprawdzaniu całej populacji
+    grid = SpatialGrid()
+    for index, person in enumerate(population):
+        if isinstance(person, Infected) and not person.zniknięty:
+            grid.insert(index, person.x, person.y)
+
+    if profiler is not None:
+        profiler.add_time("infection", time.perf_counter() - started)
+
+    for index, person in enumerate(population):
+        if profiler is not None:
+            started = time.perf_counter()
 
-    for person in population:
         person.move(grid_size)
+        newly_infected = False
+
+        if index in grid:
+            if person.zniknięty:
+                grid.remove(index)
+            else:
+                grid.move(index, person.x, person.y)
+
+        if profiler is not None:
+            moved = time.perf_counter()
+            profiler.add_time("move", moved - started)
 
-        if isinstance(person, Healthy):
-            for other in population:
-                if isinstance(other, Infected) and not other.zniknięty:
-                    distance = person.distance_to(other)
-                    if distance <= 2:
-                        contact_tracker[(person.id, other.id)] = contact_tracker.get((person.id, other.id), 0) + 1
-                        if contact_tracker[(person.id, other.id)] >= 75:
-                            if (other.objawy) or (not other.objawy and random.random() < 0.5):
-                                person = person.infect()
-                                break
-                    else:
-                        contact_tracker[(person.id, other.id)] = 0
+        if isinstance(person, Healthy) and not person.zniknięty:
+            candidates = list(grid.nearby(person.x, person.y))
+            distance_checks += len(candidates)
+            in_range = []
+            for other_index in candidates:
+                other = population[other_index]
+                dx = person.x - other.x
+                dy = person.y - other.y
+                if dx * dx + dy * dy <= INFECTION_RADIUS_SQ:
+                    in_range.append(other_index)
+            contacts += len(in_range)
+
+            for other_index in sorted(in_range):
+                other = population[other_index]
+                if contact_tracker.touch(person.id, other.id) >= 75:
+                    if (other.objawy) or (not other.objawy and random.random() < 0.5):
+                        person = person.infect()
+                        newly_infected = True
+                        infections += 1
+                        break
 
         if isinstance(person, Infected):
             if not person.zniknięty:
+                # Zakażeni przed tym krokiem liczą czas choroby i po max_czas_zakażenia stają się odporni,
+                # tak jak w VectorizedPopulation._recover; w siatce do końca kroku zostają jako zakażeni
+                if not newly_infected:
+                    person = person.infect()
                 new_population.append(person)
 
         elif not person.zniknięty:
             new_population.append(person)
 
+        if profiler is not None:
+            profiler.add_time("infection", time.perf_counter() - moved)
+
+    contact_tracker.end_step()
+    exits = len(population) - len(new_population)
+
+    if profiler is not None:
+        started = time.perf_counter()
+
+    # Nowe osoby dostają nieużywane id, żeby nie przejęły kontaktów kogoś, kto nadal jest na planszy
+    next_id = max((p.id for p in population), default=-1) + 1
     while len(new_population) < liczba_osobników:
-        new_population.append(add_new_person(grid_size, len(new_population)))
+        new_population.append(add_new_person(grid_size, next_id))
+        next_id += 1
+
+    if profiler is not None:
+        profiler.add_time("refill", time.perf_counter() - started)
+        profiler.count("distance_checks", distance_checks)
+        profiler.count("contacts", contacts)
+        profiler.count("infections", infections)
+        profiler.count("exits", exits)
+        profiler.count("spawns", len(new_population) - (len(population) - exits))
 
     return new_population
 
 
-def symulacja_animowana(liczba_osobników, wymiary, czas_symulacji, odporni):
+HEALTHY, INFECTED, IMMUNE = 0, 1, 2
+STATE_NAMES = ("Healthy", "Infected", "Immune")
+STATE_CODES = {Healthy: HEALTHY, Infected: INFECTED, Immune: IMMUNE}
+AGENT_FIELDS = ("x", "y", "vx", "vy", "state", "czas_zakażenia", "max_czas_zakażenia", "objawy", "ids")
+
+
+def grid_contact_pairs(healthy_x, healthy_y, infected_x, infected_y):
+    """Pary indeksów (zdrowy, zakażony) w zasięgu zakażenia oraz liczba sprawdzonych odległości."""
+    empty = np.empty(0, dtype=np.intp)
+    if len(healthy_x) == 0 or len(infected_x) == 0:
+        return empty, empty, 0
+
+    hcx = np.floor(healthy_x / GRID_CELL_SIZE).astype(np.int64)
+    hcy = np.floor(healthy_y / GRID_CELL_SIZE).astype(np.int64)
+    icx = np.floor(infected_x / GRID_CELL_SIZE).astype(np.int64)
+    icy = np.floor(infected_y / GRID_CELL_SIZE).astype(np.int64)
+
+    # Klucz komórki jako jedna liczba; zapas o 2 komórki z każdej strony na sąsiedztwo
+    min_x = min(hcx.min(), icx.min()) - 2
+    min_y = min(hcy.min(), icy.min()) - 2
+    height = max(hcy.max(), icy.max()) - min_y + 3
+    infected_keys = (icx - min_x) * height + (icy - min_y)
+    order = np.argsort(infected_keys, kind="stable")
+    sorted_keys = infected_keys[order]
+
+    pairs_h, pairs_i = [], []
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            keys = (hcx + dx - min_x) * height + (hcy + dy - min_y)
+            lo = np.searchsorted(sorted_keys, keys, side="left")
+            hi = np.searchsorted(sorted_keys, keys, side="right")
+            counts = hi - lo
+            total = counts.sum()
+            if total == 0:
+                continue
+            starts = np.repeat(lo - (np.cumsum(counts) - counts), counts)
+            pairs_h.append(np.repeat(np.arange(len(healthy_x)), counts))
+            pairs_i.append(order[starts + np.arange(total)])
+
+    if not pairs_h:
+        return empty, empty, 0
+    pairs_h = np.concatenate(pairs_h)
+    pairs_i = np.concatenate(pairs_i)
+    dx = healthy_x[pairs_h] - infected_x[pairs_i]
+    dy = healthy_y[pairs_h] - infected_y[pairs_i]
+    close = dx * dx + dy * dy <= INFECTION_RADIUS_SQ
+    return pairs_h[close], pairs_i[close], len(pairs_h)
+
+
+class VectorizedPopulation:
+    """Populacja przechowywana w tablicach NumPy (jedna tablica na atrybut), krok liczony na całych tablicach."""
+
+    def __init__(self, liczba_osobników, wymiary, odporni=0.0, seed=None, initial_infected=25):
+        self.liczba_osobników = liczba_osobników
+        self.wymiary = wymiary
+        self.rng = np.random.default_rng(seed)
+
+        n = liczba_osobników
+        self.x = self.rng.uniform(0, wymiary[0], n)
+        self.y = self.rng.uniform(0, wymiary[1], n)
+        self.vx = self.rng.uniform(-2.5, 2.5, n)
+        self.vy = self.rng.uniform(-2.5, 2.5, n)
+        self.state = np.where(self.rng.random(n) < odporni, IMMUNE, HEALTHY).astype(np.int8)
+        self.czas_zakażenia = np.zeros(n, dtype=np.int32)
+        self.max_czas_zakażenia = np.zeros(n, dtype=np.int32)
+        self.objawy = np.zeros(n, dtype=bool)
+        self.ids = np.arange(n, dtype=np.int64)
+        self.next_id = n
+        self.contacts = ContactTracker()
+
+        healthy = np.flatnonzero(self.state == HEALTHY)
+        chosen = self.rng.choice(healthy, size=min(initial_infected, len(healthy)), replace=False)
+        self._infect(chosen)
+
+    @classmethod
+    def from_population(cls, population, wymiary, liczba_osobników=None, seed=None):
+        population = [p for p in population if not p.zniknięty]
+        engine = cls.__new__(cls)
+        engine.liczba_osobników = len(population) if liczba_osobników is None else liczba_osobników
+        engine.wymiary = wymiary
+        engine.rng = np.random.default_rng(seed)
+        engine.x = np.array([p.x for p in population], dtype=float)
+        engine.y = np.array([p.y for p in population], dtype=float)
+        engine.vx = np.array([p.velocity.x for p in population], dtype=float)
+        engine.vy = np.array([p.velocity.y for p in population], dtype=float)
+        engine.state = np.array([STATE_CODES[type(p)] for p in population], dtype=np.int8)
+        engine.czas_zakażenia = np.array([getattr(p, "czas_zakażenia", 0) for p in population], dtype=np.int32)
+        engine.max_czas_zakażenia = np.array([getattr(p, "max_czas_zakażenia", 0) for p in population], dtype=np.int32)
+        engine.objawy = np.array([getattr(p, "objawy", False) for p in population], dtype=bool)
+        engine.ids = np.array([p.id for p in population], dtype=np.int64)
+        engine.next_id = int(engine.ids.max()) + 1 if len(population) else 0
+        engine.contacts = ContactTracker()
+        return engine
+
+    def checkpoint_arrays(self):
+        """Pełny stan silnika jako słownik tablic do zapisu w pliku .npz."""
+        arrays = {name: getattr(self, name) for name in AGENT_FIELDS}
+        pairs = list(self.contacts.durations.items())
+        arrays["contact_healthy"] = np.array([pair[0] for pair, _ in pairs], dtype=np.int64)
+        arrays["contact_infected"] = np.array([pair[1] for pair, _ in pairs], dtype=np.int64)
+        arrays["contact_duration"] = np.array([duration for _, duration in pairs], dtype=np.int32)
+        arrays["liczba_osobników"] = np.array(self.liczba_osobników)
+        arrays["wymiary"] = np.array(self.wymiary if self.wymiary is not None else (np.nan, np.nan), dtype=float)
+        arrays["next_id"] = np.array(self.next_id)
+        arrays["numpy_rng_state"] = np.array(json.dumps(self.rng.bit_generator.state))
+        return arrays
+
+    @classmethod
+    def from_checkpoint_arrays(cls, data):
+        engine = cls.__new__(cls)
+        for name in AGENT_FIELDS:
+            setattr(engine, name, np.array(data[name]))
+        engine.liczba_osobników = int(data["liczba_osobników"])
+        wymiary = tuple(float(v) for v in data["wymiary"])
+        engine.wymiary = None if math.isnan(wymiary[0]) else wymiary
+        engine.next_id = int(data["next_id"])
+        engine.rng = np.random.default_rng()
+        engine.rng.bit_generator.state = json.loads(str(data["numpy_rng_state"]))
+        engine.contacts = ContactTracker()
+        engine.contacts.durations = {
+            (int(h), int(i)): int(d)
+            for h, i, d in zip(data["contact_healthy"], data["contact_infected"], data["contact_duration"])
+        }
+        return engine
+
+    def save_checkpoint(self, filename=NUMPY_CHECKPOINT):
+        np.savez(filename, engine=np.array("numpy"), **self.checkpoint_arrays())
+
+    @classmethod
+    def load_checkpoint(cls, filename=NUMPY_CHECKPOINT):
+        with np.load(filename) as data:
+            if checkpoint_engine(data) != "numpy":
+                raise ValueError(f"Plik {filename} zawiera stan silnika {checkpoint_engine(data)}, a nie numpy")
+            return cls.from_checkpoint_arrays(data)
+
+    def __len__(self):
+        return len(self.x)
+
+    def counts(self):
+        return np.bincount(self.state, minlength=3)
+
+    def _new_velocities(self, indices):
+        self.vx[indices] = self.rng.uniform(-2.5, 2.5, len(indices))
+        self.vy[indices] = self.rng.uniform(-2.5, 2.5, len(indices))
+
+    def _infect(self, indices):
+        # Jak Healthy.infect: nowa osoba Infected z nowym losowym wektorem prędkości
+        self.state[indices] = INFECTED
+        self.czas_zakażenia[indices] = 0
+        self.objawy[indices] = self.rng.random(len(indices)) < 0.5
+        self.max_czas_zakażenia[indices] = self.rng.integers(20, 31, len(indices)) * 25
+        self._new_velocities(indices)
+
+    def _move(self):
+        n = len(self)
+        change = np.flatnonzero(self.rng.random(n) < 0.1)
+        self._new_velocities(change)
+
+        self.x += self.vx
+        self.y += self.vy
+
+        gone = np.zeros(n, dtype=bool)
+        for position, velocity, limit in ((self.x, self.vx, self.wymiary[0]), (self.y, self.vy, self.wymiary[1])):
+            outside = (position < 0) | (position > limit)
+            leaves = self.rng.random(n) < 0.5
+            gone |= outside & leaves
+            velocity[outside & ~leaves] *= -1
+        return gone
+
+    def contact_pairs(self, active):
+        """Pary (zdrowy, zakażony) w zasięgu zakażenia, wyznaczane na siatce komórek jak w SpatialGrid."""
+        healthy = np.flatnonzero(active & (self.state == HEALTHY))
+        infected = np.flatnonzero(active & (self.state == INFECTED))
+        pairs_h, pairs_i, self.distance_checks = grid_contact_pairs(
+            self.x[healthy], self.y[healthy], self.x[infected], self.y[infected]
+        )
+        return healthy[pairs_h], infected[pairs_i]
+
+    def _contact_counts(self, pairs_h, pairs_i):
+        durations = self.contacts.update(self.ids[pairs_h].tolist(), self.ids[pairs_i].tolist())
+        return np.array(durations, dtype=np.int32)
+
+    def step(self, profiler=None):
+        if profiler is not None:
+            profiler.begin_step()
+            started = time.perf_counter()
+
+        gone = self._move()
+        active = ~gone
+
+        if profiler is not None:
+            moved = time.perf_counter()
+            profiler.add_time("move", moved - started)
+
+        pairs_h, pairs_i = self.contact_pairs(active)
+        counts = self._contact_counts(pairs_h, pairs_i)
+        contacts = len(pairs_h)
+        newly_infected = self._transmissions(pairs_h, counts, self.objawy[pairs_i])
+        self._recover()
+        self._infect(newly_infected)
+
+        if profiler is not None:
+            infected_done = time.perf_counter()
+            profiler.add_time("infection", infected_done - moved)
+
+        exits = int(gone.sum())
+        if exits:
+            self._keep(active)
+        spawns = self.liczba_osobników - len(self)
+        self._spawn(spawns)
+
+        if profiler is not None:
+            profiler.add_time("refill", time.perf_counter() - infected_done)
+            profiler.count("distance_checks", self.distance_checks)
+            profiler.count("contacts", contacts)
+            profiler.count("infections", len(newly_infected))
+            profiler.count("exits", exits)
+            profiler.count("spawns", max(spawns, 0))
+        return exits
+
+    def _transmissions(self, pairs_h, durations, objawy):
+        """Zdrowi (indeksy z pairs_h) zakażeni w tym kroku przez kontakty trwające co najmniej 75 klatek."""
+        long_enough = durations >= 75
+        pairs_h, objawy = pairs_h[long_enough], objawy[long_enough]
+        transmits = objawy | (self.rng.random(len(pairs_h)) < 0.5)
+        return np.unique(pairs_h[transmits])
+
+    def _recover(self):
+        # Jak Infected.infect: licznik czasu zakażenia rośnie, po max_czas_zakażenia osoba staje się odporna
+        infected = np.flatnonzero(self.state == INFECTED)
+        self.czas_zakażenia[infected] += 1
+        recovered = infected[self.czas_zakażenia[infected] >= self.max_czas_zakażenia[infected]]
+        self.state[recovered] = IMMUNE
+        self._new_velocities(recovered)
+
+    def _keep(self, mask):
+        for name in AGENT_FIELDS:
+            setattr(self, name, getattr(self, name)[mask])
+
+    def _spawn(self, count, edges=None, x_range=None):
+        if count <= 0:
+            return
+        # Jak add_new_person: nowa osoba pojawia się na losowej krawędzi, 10% szans na zakażenie.
+        # Krawędzie: 0 - dolna (y = 0), 1 - górna, 2 - lewa (x = 0), 3 - prawa.
+        edge = self.rng.integers(0, 4, count) if edges is None else self.rng.choice(edges, count)
+        along_x = self.rng.uniform(*(x_range or (0, self.wymiary[0])), count)
+        along_y = self.rng.uniform(0, self.wymiary[1], count)
+        x = np.where(edge < 2, along_x, np.where(edge == 2, 0.0, self.wymiary[0]))
+        y = np.where(edge == 0, 0.0, np.where(edge == 1, self.wymiary[1], along_y))
+
+        start = len(self)
+        self.x = np.concatenate([self.x, x])
+        self.y = np.concatenate([self.y, y])
+        self.vx = np.concatenate([self.vx, np.zeros(count)])
+        self.vy = np.concatenate([self.vy, np.zeros(count)])
+        self.state = np.concatenate([self.state, np.full(count, HEALTHY, dtype=np.int8)])
+        self.czas_zakażenia = np.concatenate([self.czas_zakażenia, np.zeros(count, dtype=np.int32)])
+        self.max_czas_zakażenia = np.concatenate([self.max_czas_zakażenia, np.zeros(count, dtype=np.int32)])
+        self.objawy = np.concatenate([self.objawy, np.zeros(count, dtype=bool)])
+        self.ids = np.concatenate([self.ids, np.arange(self.next_id, self.next_id + count, dtype=np.int64)])
+        self.next_id += count
+
+        new = np.arange(start, start + count)
+        self._new_velocities(new)
+        self._infect(new[self.rng.random(count) < 0.1])
+
+    def to_dicts(self):
+        records = []
+        for i in range(len(self)):
+            record = {
+                "x": float(self.x[i]),
+                "y": float(self.y[i]),
+                "id": int(self.ids[i]),
+                "type": STATE_NAMES[self.state[i]],
+                "vx": float(self.vx[i]),
+                "vy": float(self.vy[i]),
+            }
+            if self.state[i] == INFECTED:
+                record["czas_zakażenia"] = int(self.czas_zakażenia[i])
+                record["objawy"] = bool(self.objawy[i])
+                record["max_czas_zakażenia"] = int(self.max_czas_zakażenia[i])
+            records.append(record)
+        return records
+
+    def to_population(self):
+        return [FileHandling.create_person_from_dict(record) for record in self.to_dicts()]
+
+
+TRAJECTORY_MAGIC = b"EPITRAJ1"
+TRAJECTORY_DTYPE = np.dtype([("krok", "<u4"), ("id", "<i8"), ("x", "<f4"), ("y", "<f4"), ("state", "i1")])
+
+
+class TrajectoryWriter:
+    """Dopisuje po każdym kroku rekordy wszystkich osób do pliku binarnego o stałej długości rekordu.
+
+    Domyślnie zaczyna plik od nowa; z append=True dopisuje do istniejącego, numerując kroki dalej od ostatniego w pliku.
+    """
+
+    def __init__(self, filename="trajectory.bin", append=False):
+        self.filename = filename
+        self.step_offset = 0
+        if append and os.path.exists(filename) and os.path.getsize(filename) > 0:
+            records = open_trajectory(filename)
+            # Wystarczy ostatni rekord: każdy zapis przez TrajectoryWriter zachowuje rosnącą kolejność kroków
+            if len(records):
+                self.step_offset = int(records["krok"][-1])
+            # Urwany ostatni rekord zostałby przesunięty względem nowych, więc jest odcinany
+            size = len(TRAJECTORY_MAGIC) + len(records) * TRAJECTORY_DTYPE.itemsize
+            del records
+            os.truncate(filename, size)
+            self.file = open(filename, "ab")
+        else:
+            self.file = open(filename, "wb")
+            self.file.write(TRAJECTORY_MAGIC)
+        self.last_step = self.step_offset
+
+    def append(self, krok, population):
+        step = krok + self.step_offset
+        if step < self.last_step:
+            raise ValueError(f"Krok {step} jest wcześniejszy niż ostatni zapisany ({self.last_step})")
+        self.last_step = step
+        if isinstance(population, VectorizedPopulation):
+            records = np.empty(len(population), dtype=TRAJECTORY_DTYPE)
+            records["id"] = population.ids
+            records["x"] = population.x
+            records["y"] = population.y
+            records["state"] = population.state
+        else:
+            population = [p for p in population if not p.zniknięty]
+            records = np.empty(len(population), dtype=TRAJECTORY_DTYPE)
+            records["id"] = [p.id for p in population]
+            records["x"] = [p.x for p in population]
+            records["y"] = [p.y for p in population]
+            records["state"] = [STATE_CODES[type(p)] for p in population]
+        records["krok"] = step
+        self.file.write(records.tobytes())
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_trajectory(filename="trajectory.bin"):
+    """Mapuje plik trajektorii do pamięci bez wczytywania go; urwany ostatni rekord jest pomijany.
+
+    Plik nie jest przeglądany w całości; kolejność kroków pilnuje TrajectoryWriter przy zapisie,
+    a trajectory_step sprawdza ją wokół wyszukanego kroku.
+    """
+    with open(filename, "rb") as file:
+        if file.read(len(TRAJECTORY_MAGIC)) != TRAJECTORY_MAGIC:
+            raise ValueError(f"Plik {filename} nie jest zapisem trajektorii")
+    count = (os.path.getsize(filename) - len(TRAJECTORY_MAGIC)) // TRAJECTORY_DTYPE.itemsize
+    if count == 0:
+        return np.empty(0, dtype=TRAJECTORY_DTYPE)
+    return np.memmap(filename, dtype=TRAJECTORY_DTYPE, mode="r", offset=len(TRAJECTORY_MAGIC), shape=(count,))
+
+
+def trajectory_step(records, krok):
+    steps = records["krok"]
+    lo = np.searchsorted(steps, krok, side="left")
+    hi = np.searchsorted(steps, krok, side="right")
+    # Wyszukiwanie binarne zakłada rosnące kroki; czytany fragment i jego sąsiedzi muszą się z tym zgadzać
+    if (np.any(steps[lo:hi] != krok) or (lo > 0 and steps[lo - 1] > krok)
+            or (hi < len(steps) and steps[hi] < krok)):
+        raise ValueError("Kroki w pliku trajektorii nie są uporządkowane rosnąco")
+    return records[lo:hi]
+
+
+def benchmark_update_population(sizes=(150, 1000, 10000, 100000), steps=10, seed=0, engine="objects", workers=None):
+    # Gęstość populacji jak w domyślnej symulacji: 150 osób na planszy 300 x 300
+    for liczba_osobników in sizes:
+        random.seed(seed)
+        bok = 300 * math.sqrt(liczba_osobników / 150)
+        wymiary = (bok, bok)
+        if engine == "tiled":
+            # Mierzony jest cały przebieg łącznie z uruchomieniem procesów
+            start = time.perf_counter()
+            run_tiled(liczba_osobników, wymiary, steps, 0.0, seed, workers)
+        elif engine == "numpy":
+            population = VectorizedPopulation(liczba_osobników, wymiary, 0.0, seed)
+            start = time.perf_counter()
+            for _ in range(steps):
+                population.step()
+        else:
+            population = initialize_population(liczba_osobników, wymiary, 0.0)
+            contact_tracker = ContactTracker()
+            start = time.perf_counter()
+            for _ in range(steps):
+                population = update_population(population, wymiary, liczba_osobników, contact_tracker)
+        elapsed = (time.perf_counter() - start) / steps
+        print(f"{liczba_osobników:>8} osób: {elapsed * 1000:9.2f} ms na krok, {elapsed / liczba_osobników * 1e6:6.2f} µs na osobę")
+
+
+AGENT_DTYPES = {
+    "x": np.float64, "y": np.float64, "vx": np.float64, "vy": np.float64, "state": np.int8,
+    "czas_zakażenia": np.int32, "max_czas_zakażenia": np.int32, "objawy": np.bool_, "ids": np.int64,
+}
+# Pas musi być szerszy niż dwa maksymalne przesunięcia w kroku (2.5) plus zasięg zakażenia,
+# żeby osoby przechodziły i stykały się wyłącznie z sąsiednimi pasami
+MIN_TILE_WIDTH = 2 * 2.5 + GRID_CELL_SIZE
+
+
+class SharedArrays:
+    """Tablice NumPy w jednym bloku pamięci współdzielonej; w innym procesie otwierane po nazwie bloku."""
+
+    def __init__(self, layout, name=None):
+        self.layout = layout
+        offsets = []
+        size = 0
+        for _, dtype, length in layout:
+            size = -(-size // 8) * 8
+            offsets.append(size)
+            size += np.dtype(dtype).itemsize * length
+        self.shm = shared_memory.SharedMemory(name=name, create=name is None, size=max(size, 1))
+        self.arrays = {
+            field: np.ndarray((length,), dtype=dtype, buffer=self.shm.buf, offset=offset)
+            for (field, dtype, length), offset in zip(layout, offsets)
+        }
+
+    def __reduce__(self):
+        return SharedArrays, (self.layout, self.shm.name)
+
+    def __getitem__(self, field):
+        return self.arrays[field]
+
+    def close(self):
+        self.arrays = {}
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+
+def _tile_layout(capacity, outbox, contacts):
+    layout = [(field, dtype, capacity) for field, dtype in AGENT_DTYPES.items()]
+    layout += [("alive", np.bool_, capacity), ("count", np.int64, 1)]
+    for side in ("left", "right"):
+        layout += [(f"{side}_{field}", dtype, outbox) for field, dtype in AGENT_DTYPES.items()]
+        layout += [
+            (f"{side}_count", np.int64, 1),
+            (f"{side}_contact_healthy", np.int64, contacts),
+            (f"{side}_contact_infected", np.int64, contacts),
+            (f"{side}_contact_duration", np.int32, contacts),
+            (f"{side}_contact_count", np.int64, 1),
+        ]
+    return layout
+
+
+def _view_tile(engine, block):
+    count = int(block["count"][0])
+    for field in AGENT_FIELDS:
+        setattr(engine, field, block[field][:count])
+    return count
+
+
+def _store_tile(engine, block):
+    count = len(engine.x)
+    if count > len(block["x"]):
+        raise RuntimeError("Przepełnienie pasa: zwiększ pojemność albo zmniejsz liczbę pasów")
+    for field in AGENT_FIELDS:
+        block[field][:count] = getattr(engine, field)
+    block["count"][0] = count
+    _view_tile(engine, block)
+
+
+def _tile_worker(index, blocks, results, barrier, seed_sequence, wymiary, czas_symulacji, tile_width, first_id):
+    tiles = len(blocks)
+    own = blocks[index]
+    neighbours = [(side, neighbour) for side, neighbour in (("left", index - 1), ("right", index + 1)) if 0 <= neighbour < tiles]
+    counts = results["counts"].reshape(czas_symulacji, tiles, 3)
+
+    engine = VectorizedPopulation.__new__(VectorizedPopulation)
+    engine.wymiary = wymiary
+    engine.rng = np.random.default_rng(seed_sequence)
+    engine.contacts = ContactTracker()
+    engine.next_id = first_id
+    # Nowe osoby wchodzą przez tę część brzegu planszy, która należy do pasa
+    edges = [0, 1] + ([2] if index == 0 else []) + ([3] if index == tiles - 1 else [])
+    x_range = (index * tile_width, (index + 1) * tile_width)
+
+    try:
+        for krok in range(czas_symulacji):
+            # 1. Ruch własnych osób
+            n = _view_tile(engine, own)
+            gone = engine._move()
+            alive = own["alive"][:n]
+            alive[:] = ~gone
+            barrier.wait()
+
+            # 2. Kontakty: własni zdrowi z zakażonymi z własnego pasa i z brzegów pasów sąsiednich (halo)
+            healthy = np.flatnonzero(alive & (engine.state == HEALTHY))
+            infected = np.flatnonzero(alive & (engine.state == INFECTED))
+            infected_x, infected_y = [engine.x[infected]], [engine.y[infected]]
+            infected_ids, infected_objawy = [engine.ids[infected]], [engine.objawy[infected]]
+            if len(healthy):
+                x_min = engine.x[healthy].min() - GRID_CELL_SIZE
+                x_max = engine.x[healthy].max() + GRID_CELL_SIZE
+                for _, neighbour in neighbours:
+                    block = blocks[neighbour]
+                    m = int(block["count"][0])
+                    x = block["x"][:m]
+                    halo = np.flatnonzero(
+                        block["alive"][:m] & (block["state"][:m] == INFECTED) & (x >= x_min) & (x <= x_max)
+                    )
+                    infected_x.append(x[halo])
+                    infected_y.append(block["y"][:m][halo])
+                    infected_ids.append(block["ids"][:m][halo])
+                    infected_objawy.append(block["objawy"][:m][halo])
+            infected_x, infected_y = np.concatenate(infected_x), np.concatenate(infected_y)
+            infected_ids, infected_objawy = np.concatenate(infected_ids), np.concatenate(infected_objawy)
+
+            pairs_h, pairs_i, _ = grid_contact_pairs(engine.x[healthy], engine.y[healthy], infected_x, infected_y)
+            pairs_h = healthy[pairs_h]
+            durations = np.array(
+                engine.contacts.update(engine.ids[pairs_h].tolist(), infected_ids[pairs_i].tolist()), dtype=np.int32
+            )
+            newly_infected = engine._transmissions(pairs_h, durations, infected_objawy[pairs_i])
+            # Sąsiedzi czytają stany z tego pasa aż do tej bariery, więc zmiany stanów dopiero po niej
+            barrier.wait()
+
+            # 3. Zmiany stanów i wysyłka osób, które przeszły do sąsiedniego pasa
+            engine._recover()
+            engine._infect(newly_infected)
+            destination = np.clip(np.floor(engine.x / tile_width).astype(np.int64), 0, tiles - 1)
+            leaving = alive & (destination != index)
+            for side, neighbour in neighbours:
+                migrants = np.flatnonzero(leaving & (destination == neighbour))
+                if len(migrants) > len(own[f"{side}_x"]):
+                    raise RuntimeError("Przepełnienie bufora migracji między pasami")
+                for field in AGENT_FIELDS:
+                    own[f"{side}_{field}"][:len(migrants)] = getattr(engine, field)[migrants]
+                own[f"{side}_count"][0] = len(migrants)
+
+                # Liczniki kontaktów przechodzą razem ze zdrową osobą, która je prowadzi
+                migrant_ids = set(engine.ids[migrants].tolist())
+                moved = [(pair, d) for pair, d in engine.contacts.durations.items() if pair[0] in migrant_ids]
+                if len(moved) > len(own[f"{side}_contact_healthy"]):
+                    raise RuntimeError("Przepełnienie bufora kontaktów między pasami")
+                for k, ((healthy_id, infected_id), duration) in enumerate(moved):
+                    own[f"{side}_contact_healthy"][k] = healthy_id
+                    own[f"{side}_contact_infected"][k] = infected_id
+                    own[f"{side}_contact_duration"][k] = duration
+                    del engine.contacts.durations[(healthy_id, infected_id)]
+                own[f"{side}_contact_count"][0] = len(moved)
+            barrier.wait()
+
+            # 4. Odbiór osób od sąsiadów, usunięcie odchodzących i uzupełnienie populacji pasa
+            engine._keep(alive & ~leaving)
+            for side, neighbour in neighbours:
+                block = blocks[neighbour]
+                other_side = "right" if side == "left" else "left"
+                m = int(block[f"{other_side}_count"][0])
+                for field in AGENT_FIELDS:
+                    setattr(engine, field, np.concatenate([getattr(engine, field), block[f"{other_side}_{field}"][:m]]))
+                c = int(block[f"{other_side}_contact_count"][0])
+                for healthy_id, infected_id, duration in zip(
+                    block[f"{other_side}_contact_healthy"][:c].tolist(),
+                    block[f"{other_side}_contact_infected"][:c].tolist(),
+                    block[f"{other_side}_contact_duration"][:c].tolist(),
+                ):
+                    engine.contacts.durations[(healthy_id, infected_id)] = duration
+
+            # Pasy rozdzielają identyfikatory nowych osób co `tiles`, więc się nie powtarzają
+            spawns = int(gone.sum())
+            first_spawn_id = engine.next_id
+            engine._spawn(spawns, edges, x_range)
+            if spawns:
+                engine.ids[-spawns:] = first_spawn_id + tiles * np.arange(spawns)
+            engine.next_id = first_spawn_id + tiles * spawns
+            _store_tile(engine, own)
+            counts[krok, index] = np.bincount(engine.state, minlength=3)
+    except BaseException:
+        barrier.abort()
+        raise
+
+
+def run_tiled(liczba_osobników, wymiary, czas_symulacji, odporni, seed=None, workers=None):
+    """Symulacja podzielona na pionowe pasy planszy, każdy w osobnym procesie; zwraca liczby (S, I, R) po każdym kroku.
+
+    Wynik zależy tylko od ziarna i liczby pasów. Domyślnie pasów jest tyle, ile rdzeni,
+    ale nie więcej, niż mieści się na planszy.
+    """
+    if workers is None:
+        workers = max(1, min(os.cpu_count(), math.ceil(wymiary[0] / MIN_TILE_WIDTH) - 1))
+    tile_width = wymiary[0] / workers
+    if tile_width <= MIN_TILE_WIDTH:
+        raise ValueError(f"Pas o szerokości {tile_width:.2f} jest za wąski; zmniejsz liczbę procesów")
+
+    initial = VectorizedPopulation(liczba_osobników, wymiary, odporni, seed)
+    capacity = 2 * math.ceil(liczba_osobników / workers) + 1024
+    outbox = capacity // 4 + 1024
+    blocks = [SharedArrays(_tile_layout(capacity, outbox, 4 * outbox)) for _ in range(workers)]
+    results = SharedArrays([("counts", np.int64, czas_symulacji * workers * 3)])
+
+    processes = []
+    try:
+        tile_of = np.clip(np.floor(initial.x / tile_width).astype(np.int64), 0, workers - 1)
+        for index, block in enumerate(blocks):
+            tile = VectorizedPopulation.__new__(VectorizedPopulation)
+            for field in AGENT_FIELDS:
+                setattr(tile, field, getattr(initial, field)[tile_of == index])
+            _store_tile(tile, block)
+
+        barrier = multiprocessing.Barrier(workers)
+        seeds = np.random.SeedSequence(seed).spawn(workers)
+        for index in range(workers):
+            process = multiprocessing.Process(
+                target=_tile_worker,
+                args=(index, blocks, results, barrier, seeds[index], wymiary, czas_symulacji, tile_width,
+                      liczba_osobników + index),
+            )
+            process.start()
+            processes.append(process)
+        for process in processes:
+            process.join()
+        if any(process.exitcode != 0 for process in processes):
+            raise RuntimeError("Co najmniej jeden proces symulacji zakończył się błędem")
+
+        counts = results["counts"].reshape(czas_symulacji, workers, 3).sum(axis=1)
+        return [tuple(int(c) for c in row) for row in counts]
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        for shared in blocks + [results]:
+            shared.close()
+            shared.unlink()
+
+
+class StepProfiler:
+    """Czasy faz i liczniki zdarzeń dla każdego kroku symulacji; wyłączone, gdy profiler=None."""
+
+    PHASES = ("move", "infection", "refill", "draw")
+    COUNTERS = ("distance_checks", "contacts", "infections", "exits", "spawns")
+
+    def __init__(self):
+        self.records = []
+
+    def begin_step(self):
+        record = {"krok": len(self.records) + 1}
+        record.update(dict.fromkeys(self.PHASES, 0.0))
+        record.update(dict.fromkeys(self.COUNTERS, 0))
+        self.records.append(record)
+
+    def add_time(self, phase, seconds):
+        self.records[-1][phase] += seconds
+
+    def count(self, counter, value=1):
+        self.records[-1][counter] += value
+
+    def save_csv(self, filename="profile.csv"):
+        with open(filename, "w", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=("krok",) + self.PHASES + self.COUNTERS)
+            writer.writeheader()
+            writer.writerows(self.records)
+        print(f"Profil {len(self.records)} kroków zapisany do pliku {filename}.")
+
+    def save_json(self, filename="profile.json"):
+        with open(filename, "w") as file:
+            json.dump(self.records, file)
+        print(f"Profil {len(self.records)} kroków zapisany do pliku {filename}.")
+
+    def summary(self):
+        steps = len(self.records)
+        if steps == 0:
+            print("Brak zarejestrowanych kroków.")
+            return
+        totals = {phase: sum(record[phase] for record in self.records) for phase in self.PHASES}
+        total_time = sum(totals.values()) or 1.0
+        print(f"{'faza':<16}{'razem [s]':>12}{'na krok [ms]':>15}{'udział':>9}")
+        for phase in sorted(self.PHASES, key=totals.get, reverse=True):
+            print(f"{phase:<16}{totals[phase]:>12.3f}{totals[phase] / steps * 1000:>15.3f}{totals[phase] / total_time:>9.1%}")
+        print(f"{'licznik':<16}{'razem':>12}{'na krok':>15}")
+        for counter in self.COUNTERS:
+            total = sum(record[counter] for record in self.records)
+            print(f"{counter:<16}{total:>12}{total / steps:>15.1f}")
+
+
+def run_headless(liczba_osobników, wymiary, czas_symulacji, odporni, seed=None, engine="objects", trajectory=None,
+                 profiler=None, workers=None):
+    """Symulacja bez okna, krok po kroku tak szybko, jak pozwala procesor; zwraca liczby (S, I, R) po każdym kroku.
+
+    Jeśli podano plik trajectory, po każdym kroku dopisywane są do niego pozycje i stany wszystkich osób.
+    Silnik "tiled" dzieli planszę na `workers` pasów liczonych równolegle (bez trajektorii i profilowania).
+    """
+    if engine == "tiled":
+        if trajectory is not None or profiler is not None:
+            raise ValueError("Silnik tiled nie obsługuje zapisu trajektorii ani profilowania")
+        return run_tiled(liczba_osobników, wymiary, czas_symulacji, odporni, seed, workers)
+
+    history = []
+    writer = TrajectoryWriter(trajectory) if trajectory is not None else None
+    if engine == "numpy":
+        population = VectorizedPopulation(liczba_osobników, wymiary, odporni, seed)
+        for krok in range(1, czas_symulacji + 1):
+            population.step(profiler)
+            history.append(tuple(int(c) for c in population.counts()))
+            if writer is not None:
+                writer.append(krok, population)
+    else:
+        random.seed(seed)
+        population = initialize_population(liczba_osobników, wymiary, odporni)
+        contact_tracker = ContactTracker()
+        for krok in range(1, czas_symulacji + 1):
+            population = update_population(population, wymiary, liczba_osobników, contact_tracker, profiler)
+            counts = [0, 0, 0]
+            for person in population:
+                counts[STATE_CODES[type(person)]] += 1
+            history.append(tuple(counts))
+            if writer is not None:
+                writer.append(krok, population)
+
+    if writer is not None:
+        writer.close()
+    return history
+
+
+SWEEP_COLUMNS = ("liczba_osobników", "rozmiar", "odporni", "seed", "krok", "S", "I", "R")
+
+
+def _run_scenario(scenario):
+    liczba_osobników, rozmiar, odporni, seed, czas_symulacji, engine = scenario
+    wymiary = rozmiar if isinstance(rozmiar, tuple) else (rozmiar, rozmiar)
+    history = run_headless(liczba_osobników, wymiary, czas_symulacji, odporni, seed, engine)
+    return [(liczba_osobników, rozmiar, odporni, seed, krok) + counts for krok, counts in enumerate(history, 1)]
+
+
+def run_sweep(populations, sizes, immune_shares, seeds, czas_symulacji, engine="objects", processes=None):
+    """Uruchamia wszystkie kombinacje parametrów w puli procesów; zwraca wiersze w kolejności SWEEP_COLUMNS.
+
+    Scenariusze silnika "tiled" same korzystają z `processes` procesów, więc idą po kolei.
+    """
+    scenarios = [
+        (liczba_osobników, rozmiar, odporni, seed, czas_symulacji, engine)
+        for liczba_osobników, rozmiar, odporni, seed in itertools.product(populations, sizes, immune_shares, seeds)
+    ]
+    if engine == "tiled":
+        results = []
+        for liczba_osobników, rozmiar, odporni, seed, czas_symulacji, _ in scenarios:
+            wymiary = rozmiar if isinstance(rozmiar, tuple) else (rozmiar, rozmiar)
+            history = run_tiled(liczba_osobników, wymiary, czas_symulacji, odporni, seed, processes)
+            results.append([(liczba_osobników, rozmiar, odporni, seed, krok) + counts
+                            for krok, counts in enumerate(history, 1)])
+        return [row for rows in results for row in rows]
+    with multiprocessing.Pool(processes) as pool:
+        results = pool.map(_run_scenario, scenarios, chunksize=1)
+    return [row for rows in results for row in rows]
+
+
+def save_sweep_csv(rows, filename="sweep.csv"):
+    with open(filename, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(SWEEP_COLUMNS)
+        writer.writerows(rows)
+    print(f"Wyniki {len(rows)} kroków zapisane do pliku {filename}.")
+
+
+STATE_COLORS = matplotlib.colors.to_rgba_array(["blue", "red", "green"])
+
+
+class PopulationRenderer:
+    """Rysuje populację z tablic pozycji i kolorów RGBA alokowanych raz i wypełnianych wprost ze stanu osób."""
+
+    def __init__(self, scatter, capacity):
+        self.scatter = scatter
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        self.positions = np.zeros((capacity, 2))
+        self.codes = np.zeros(capacity, dtype=np.int8)
+        self.colors = np.zeros((capacity, 4))
+
+    def draw(self, population):
+        if isinstance(population, VectorizedPopulation):
+            n = len(population)
+            if n > len(self.positions):
+                self._allocate(n)
+            self.positions[:n, 0] = population.x
+            self.positions[:n, 1] = population.y
+            self.codes[:n] = population.state
+        else:
+            # Pozycje i kolory pochodzą z tej samej listy widocznych osób, więc zawsze do siebie pasują
+            visible = [p for p in population if not p.zniknięty]
+            n = len(visible)
+            if n > len(self.positions):
+                self._allocate(n)
+            self.positions[:n, 0] = [p.x for p in visible]
+            self.positions[:n, 1] = [p.y for p in visible]
+            self.codes[:n] = [STATE_CODES[type(p)] for p in visible]
+
+        np.take(STATE_COLORS, self.codes[:n], axis=0, out=self.colors[:n])
+        self.scatter.set_offsets(self.positions[:n])
+        self.scatter.set_facecolor(self.colors[:n])
+        return (self.scatter,)
+
+
+def symulacja_animowana(liczba_osobników, wymiary, czas_symulacji, odporni, engine="objects", steps_per_frame=1, interval=40,
+                        profiler=None):
     fileHandling = FileHandling()
-    population = initialize_population(liczba_osobników, wymiary, odporni)
+    if engine == "numpy":
+        population = VectorizedPopulation(liczba_osobników, wymiary, odporni)
+    else:
+        population = initialize_population(liczba_osobników, wymiary, odporni)
+    contact_tracker = ContactTracker()
 
+    matplotlib.use('TkAgg')
     fig, ax = plt.subplots(figsize=(8, 8))
     ax.set_xlim(0, wymiary[0])
     ax.set_ylim(0, wymiary[1])
-    scatter = ax.scatter([], [], s=50)
+    scatter = ax.scatter(np.zeros(0), np.zeros(0), s=50, edgecolors="none", animated=True)
+    renderer = PopulationRenderer(scatter, liczba_osobników)
+
+    def init():
+        return renderer.draw(population)
 
     def update(frame):
         nonlocal population
-        population = update_population(population, wymiary, liczba_osobników)
-
-        scatter.set_offsets([(p.x, p.y) for p in population if not p.zniknięty])
-        scatter.set_color(
-            ["blue" if isinstance(p, Healthy) else "red" if isinstance(p, Infected) else "green" for p in population]
-        )
+        # Kilka kroków symulacji na jedną klatkę, żeby rysowanie nie ograniczało tempa modelu
+        for _ in range(steps_per_frame):
+            if engine == "numpy":
+                population.step(profiler)
+            else:
+                population = update_population(population, wymiary, liczba_osobników, contact_tracker, profiler)
+        if profiler is None:
+            return renderer.draw(population)
+        started = time.perf_counter()
+        artists = renderer.draw(population)
+        profiler.add_time("draw", time.perf_counter() - started)
+        return artists
 
     def on_key(event):
-        nonlocal population
+        nonlocal population, contact_tracker
         if event.key == 'z':
-            fileHandling.save_to_file(population)
+            if engine == "numpy":
+                fileHandling.save_records(population.to_dicts())
+            else:
+                fileHandling.save_to_file(population)
         elif event.key == 'w':
-            population = fileHandling.restore_from_file()
+            restored = fileHandling.restore_from_file()
+            if engine == "numpy":
+                population = VectorizedPopulation.from_population(restored, wymiary, liczba_osobników)
+            else:
+                population = restored
+                contact_tracker = ContactTracker()
+        elif event.key == 'x':
+            if engine == "numpy":
+                population.save_checkpoint()
+                print(f"Stan zapisany do pliku {NUMPY_CHECKPOINT}.")
+            else:
+                fileHandling.save_checkpoint(population, contact_tracker=contact_tracker,
+                                             wymiary=wymiary, liczba_osobników=liczba_osobników)
+        elif event.key == 'c':
+            if engine == "numpy":
+                try:
+                    population = VectorizedPopulation.load_checkpoint()
+                    print(f"Stan przywrócony z pliku {NUMPY_CHECKPOINT}.")
+                except FileNotFoundError:
+                    print(f"Plik {NUMPY_CHECKPOINT} nie istnieje.")
+                except Exception as e:
+                    print(f"Błąd podczas odczytu pliku: {e}")
+            else:
+                restored = fileHandling.restore_checkpoint()
+                if restored is not None:
+                    population, contact_tracker = restored
 
     fig.canvas.mpl_connect('key_press_event', on_key)
 
-    anim = FuncAnimation(fig, update, frames=czas_symulacji, interval=40, repeat=False)
+    frames = math.ceil(czas_symulacji / steps_per_frame)
+    anim = FuncAnimation(fig, update, frames=frames, init_func=init, interval=interval, blit=True, repeat=False)
     plt.show()
 
 
-symulacja_animowana(liczba_osobników=150, wymiary=(300, 300), czas_symulacji=1000, odporni=0.0)
\ No newline at end of file
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Symulacja rozprzestrzeniania się zakażeń")
+    parser.add_argument("--benchmark", action="store_true", help="zmierz czas kroku symulacji dla rosnącej populacji")
+    parser.add_argument("--engine", choices=["objects", "numpy", "tiled"], default="objects",
+                        help="silnik symulacji: obiekty Person, tablice NumPy (VectorizedPopulation) "
+                             "albo tablice NumPy w pasach planszy liczonych równolegle (tylko --headless i --benchmark)")
+    parser.add_argument("--headless", action="store_true",
+                        help="symulacja bez okna dla wszystkich kombinacji parametrów, wyniki do pliku CSV")
+    parser.add_argument("--population", type=int, nargs="+", default=[150], help="liczby osobników")
+    parser.add_argument("--size", type=float, nargs="+", default=[300], help="boki kwadratowej planszy")
+    parser.add_argument("--immune", type=float, nargs="+", default=[0.0], help="odsetki osób odpornych")
+    parser.add_argument("--seed", type=int, nargs="+", default=[0], help="ziarna generatora liczb losowych")
+    parser.add_argument("--steps", type=int, default=1000, help="liczba kroków symulacji")
+    parser.add_argument("--processes", type=int, default=None, help="liczba procesów (domyślnie wszystkie rdzenie)")
+    parser.add_argument("--output", default="sweep.csv", help="plik CSV z wynikami trybu --headless")
+    parser.add_argument("--steps-per-frame", type=int, default=1, help="liczba kroków symulacji na klatkę animacji")
+    parser.add_argument("--interval", type=int, default=40, help="odstęp między klatkami animacji w ms")
+    parser.add_argument("--profile", metavar="PLIK",
+                        help="zmierz fazy każdego kroku pierwszego scenariusza i zapisz je do pliku .csv albo .json")
+    args = parser.parse_args()
+    if args.engine == "tiled" and (args.profile or not (args.headless or args.benchmark)):
+        parser.error("silnik tiled działa tylko z --headless albo --benchmark, bez --profile")
+
+    if args.benchmark:
+        benchmark_update_population(engine=args.engine, workers=args.processes)
+    elif args.profile:
+        profiler = StepProfiler()
+        if args.headless:
+            run_headless(args.population[0], (args.size[0], args.size[0]), args.steps, args.immune[0], args.seed[0],
+                         args.engine, profiler=profiler, workers=args.processes)
+        else:
+            symulacja_animowana(liczba_osobników=args.population[0], wymiary=(args.size[0], args.size[0]),
+                                czas_symulacji=args.steps, odporni=args.immune[0], engine=args.engine,
+                                steps_per_frame=args.steps_per_frame, interval=args.interval, profiler=profiler)
+        profiler.summary()
+        if args.profile.endswith(".json"):
+            profiler.save_json(args.profile)
+        else:
+            profiler.save_csv(args.profile)
+    elif args.headless:
+        rows = run_sweep(args.population, args.size, args.immune, args.seed, args.steps, args.engine, args.processes)
+        save_sweep_csv(rows, args.output)
+    else:
+        symulacja_animowana(liczba_osobników=args.population[0], wymiary=(args.size[0], args.size[0]),
+                            czas_symulacji=args.steps, odporni=args.immune[0], engine=args.engine,
+                            steps_per_frame=args.steps_per_frame, interval=args.interval)
\ No newline at end of file
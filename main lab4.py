@@ -1,7 +1,17 @@
+import sys
 import math
 import time
+import os
+import queue
+import threading
+import argparse
+import heapq
 import random
-from functools import partial
+import itertools
+import statistics
+from collections import deque, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 from typing import List, Iterator
 from abc import ABC, abstractmethod
 
@@ -13,8 +23,22 @@ LON_MIN, LON_MAX = 19.688292482742394, 20.02470275868903
 INCIDENT_TYPES = ["PZ", "AF", "MZ"]
 INCIDENT_PROBABILITIES = [0.7, 0.05, 0.25]
 
+# Equirectangular projection around the middle of the area, accurate to well under 0.1% at this scale
+EARTH_RADIUS_KM = 6371.0088
+REFERENCE_LAT = (LAT_MIN + LAT_MAX) / 2
+KM_PER_DEG_LAT = math.pi * EARTH_RADIUS_KM / 180
+KM_PER_DEG_LON = KM_PER_DEG_LAT * math.cos(math.radians(REFERENCE_LAT))
+
 
 class VehicleState(ABC):
+    # States carry no data, so each subclass has a single shared instance instead of one per transition
+    _instance = None
+
+    def __new__(cls):
+        if cls.__dict__.get("_instance") is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
     @abstractmethod
     def handle(self, vehicle):
         pass
@@ -46,23 +70,110 @@ class FireStationIterator:
 # Observer
 class Observer(ABC):
     @abstractmethod
-    def update(self, data):
+    def update(self, data, log=print):
         pass
 
 class SKKM:
-    def __init__(self):
+    def __init__(self, bus=None):
         self.observers = []
+        self.bus = bus
 
-    def add_observer(self, observer: Observer):
+    def add_observer(self, observer: Observer, categories=None, center=None, radius_km=None):
         self.observers.append(observer)
+        if self.bus is not None:
+            self.bus.subscribe(observer, categories, center, radius_km)
 
     def notify_all(self, data):
+        if self.bus is not None:
+            self.bus.publish(data)
+            return
         for observer in self.observers:
             observer.update(data)
 
+
+class Subscription:
+    __slots__ = ("observer", "categories", "center", "radius_km")
+
+    def __init__(self, observer, categories=None, center=None, radius_km=None):
+        self.observer = observer
+        self.categories = frozenset(categories) if categories is not None else None
+        # Without an explicit center the radius is measured from the observer itself (a station)
+        if radius_km is not None and center is None:
+            center = (observer.width, observer.height)
+        self.center = project(*center) if center is not None else None
+        self.radius_km = radius_km
+
+    def matches(self, data):
+        if self.categories is not None and data["type"] not in self.categories:
+            return False
+        if self.radius_km is not None:
+            x, y = project(data["width"], data["height"])
+            return math.hypot(x - self.center[0], y - self.center[1]) <= self.radius_km
+        return True
+
+
+class NotificationBus:
+    """Delivers notifications on a worker thread, so publishing costs one queue put however many observers there are.
+
+    The worker drains up to batch_size notifications at a time, filters them per subscription
+    and writes the observers' log lines to the stream in one call per batch. Lines passed to log()
+    go through the same queue, so they stay in order with the notifications.
+    """
+
+    _STOP = object()
+
+    def __init__(self, batch_size=256, stream=None):
+        self.subscriptions = []
+        self.batch_size = batch_size
+        self.stream = stream or sys.stdout
+        self.pending = queue.SimpleQueue()
+        self.delivered = 0
+        self.worker = threading.Thread(target=self._drain, name="notification-bus", daemon=True)
+        self.worker.start()
+
+    def subscribe(self, observer, categories=None, center=None, radius_km=None):
+        # Copy on write, so the worker never sees the list change mid-iteration
+        self.subscriptions = self.subscriptions + [Subscription(observer, categories, center, radius_km)]
+
+    def publish(self, data):
+        self.pending.put(data)
+
+    def log(self, message):
+        self.pending.put(message)
+
+    def _drain(self):
+        while True:
+            batch = [self.pending.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.pending.get_nowait())
+                except queue.Empty:
+                    break
+            lines = []
+            for data in batch:
+                if data is self._STOP:
+                    continue
+                if isinstance(data, str):
+                    lines.append(data)
+                    continue
+                for subscription in self.subscriptions:
+                    if subscription.matches(data):
+                        subscription.observer.update(data, lines.append)
+                        self.delivered += 1
+            if lines:
+                self.stream.write("\n".join(lines) + "\n")
+                self.stream.flush()
+            if any(data is self._STOP for data in batch):
+                return
+
+    def close(self):
+        self.pending.put(self._STOP)
+        self.worker.join()
+
 class Vehicle:
-    def __init__(self, id):
+    def __init__(self, id, station=None):
         self.id = id
+        self.station = station
         self.state = "Free"
 
     def change_state(self, state):
@@ -76,18 +187,50 @@ class FireStation(Observer):
         self.name = name
         self.width = width
         self.height = height
-        self.vehicles = [Vehicle(f"{name}-{i + 1}") for i in range(5)]
+        self.vehicles = [Vehicle(f"{name}-{i + 1}", self) for i in range(5)]
+        self.free_vehicles = deque(self.vehicles)
+        self.busy_vehicles = set()
+        self.capacity = None
+
+    def update(self, data, log=print):
+        log(f"Jednostka {self.name} została powiadomiona o {data['type']} w ({data['width']}, {data['height']})")
 
-    def update(self, data):
-        print(f"Jednostka {self.name} została powiadomiona o {data['type']} w ({data['width']}, {data['height']})")
+    def has_free_vehicles(self):
+        return bool(self.free_vehicles)
 
     def dispatch_vehicles(self, num_vehicles):
-        free_vehicles = [v for v in self.vehicles if v.state == "Free"]
-        dispatched = free_vehicles[:num_vehicles]
-        for vehicle in dispatched:
+        dispatched = []
+        while self.free_vehicles and len(dispatched) < num_vehicles:
+            vehicle = self.free_vehicles.popleft()
             vehicle.change_state(OnTheWayState())
+            self.busy_vehicles.add(vehicle)
+            dispatched.append(vehicle)
+        if self.capacity is not None:
+            self.capacity.free -= len(dispatched)
         return dispatched
 
+    def release_vehicle(self, vehicle):
+        self.busy_vehicles.remove(vehicle)
+        vehicle.change_state(FreeState())
+        self.free_vehicles.append(vehicle)
+        if self.capacity is not None:
+            self.capacity.free += 1
+
+
+class FleetCapacity:
+    """Free and total vehicle counts over all registered stations, kept up to date by the stations themselves."""
+
+    def __init__(self, stations=()):
+        self.free = 0
+        self.total = 0
+        for station in stations:
+            self.register(station)
+
+    def register(self, station):
+        station.capacity = self
+        self.free += len(station.free_vehicles)
+        self.total += len(station.vehicles)
+
 
 class Incident:
     def __init__(self, category, width, height):
@@ -96,27 +239,81 @@ class Incident:
         self.height = height
 
 
-def generate_random_incident():
-    type = random.choices(INCIDENT_TYPES, INCIDENT_PROBABILITIES)[0]
-    width = random.uniform(LAT_MIN, LAT_MAX)
-    height = random.uniform(LON_MIN, LON_MAX)
+def generate_random_incident(rng=random):
+    type = rng.choices(INCIDENT_TYPES, INCIDENT_PROBABILITIES)[0]
+    width = rng.uniform(LAT_MIN, LAT_MAX)
+    height = rng.uniform(LON_MIN, LON_MAX)
     return Incident(type, width, height)
 
 
-def distance(station, incident):
-    return math.sqrt((station.width - incident.width) ** 2 + (station.height - incident.height) ** 2)
+def project(width, height):
+    # width is latitude and height is longitude throughout this module
+    return height * KM_PER_DEG_LON, width * KM_PER_DEG_LAT
+
 
+# Spatial index (k-d tree)
+class _KDNode:
+    __slots__ = ("box", "stations", "left", "right")
+
+    def __init__(self, box, stations=None, left=None, right=None):
+        self.box = box
+        self.stations = stations
+        self.left = left
+        self.right = right
 
-def free_busy_vehicles(busy_vehicles, current_time):
-    for vehicle, release_time in busy_vehicles.copy():
-        if current_time >= release_time:
-            vehicle.change_state(FreeState())
-            busy_vehicles.remove((vehicle, release_time))
-            print(f"Pojazd {vehicle.id} jest już wolny")
 
-def simulate_continuous():
-    skkm = SKKM()
-    fire_stations = [
+class StationIndex:
+    LEAF_SIZE = 8
+
+    def __init__(self, stations):
+        points = [(project(s.width, s.height), s) for s in stations]
+        self.root = self._build(points, 0) if points else None
+
+    def _build(self, points, depth):
+        xs = [p[0][0] for p in points]
+        ys = [p[0][1] for p in points]
+        box = (min(xs), max(xs), min(ys), max(ys))
+        if len(points) <= self.LEAF_SIZE:
+            return _KDNode(box, stations=points)
+        axis = depth % 2
+        points.sort(key=lambda p: p[0][axis])
+        middle = len(points) // 2
+        return _KDNode(box, left=self._build(points[:middle], depth + 1), right=self._build(points[middle:], depth + 1))
+
+    @staticmethod
+    def _box_distance_sq(box, x, y):
+        dx = max(box[0] - x, 0.0, x - box[1])
+        dy = max(box[2] - y, 0.0, y - box[3])
+        return dx * dx + dy * dy
+
+    def nearest(self, width, height, predicate=None):
+        """Yields stations in increasing distance (km) from the point, lazily; skips stations rejected by predicate."""
+        if self.root is None:
+            return
+        x, y = project(width, height)
+        counter = itertools.count()
+        # Nodes enter the heap with the distance to their bounding box, stations with their exact distance,
+        # so a station is popped only when nothing closer can remain
+        heap = [(0.0, next(counter), self.root, None)]
+        while heap:
+            distance_sq, _, node, station = heapq.heappop(heap)
+            if station is not None:
+                if predicate is None or predicate(station):
+                    yield station
+            elif node.stations is not None:
+                for (station_x, station_y), candidate in node.stations:
+                    d = (station_x - x) ** 2 + (station_y - y) ** 2
+                    heapq.heappush(heap, (d, next(counter), None, candidate))
+            else:
+                for child in (node.left, node.right):
+                    heapq.heappush(heap, (self._box_distance_sq(child.box, x, y), next(counter), child, None))
+
+    def k_nearest(self, width, height, k, predicate=None):
+        return list(itertools.islice(self.nearest(width, height, predicate), k))
+
+
+def create_fire_stations():
+    return [
         FireStation("JRG-1", 50.06005865507538, 19.943145813490625),
         FireStation("JRG-2", 50.033434183133245, 19.93583717116354),
         FireStation("JRG-3", 50.07575650438391, 19.887307269218),
@@ -129,24 +326,93 @@ def simulate_continuous():
         FireStation("LSP", 50.077249280379306, 19.786397563318232)
     ]
 
-    fire_station_iterator = FireStationIterator(fire_stations)
-
-    for station in fire_station_iterator: 
-        skkm.add_observer(station)
 
-    busy_vehicles = []
+# Discrete-event engine
+INCIDENT, ARRIVAL, RELEASE = 0, 1, 2
 
-    while True:
-        incident = generate_random_incident()
-        current_time = time.time()
-        free_busy_vehicles(busy_vehicles, current_time)        
 
-        print(f"Nowe zdarzenie '{incident.category}' w ({incident.width}, {incident.height})")
+class DispatchSimulation:
+    """Dispatch driven by a heap of timestamped events.
 
-        skkm.notify_all({"type": incident.category, "width": incident.width, "height": incident.height})
+    time_scale=0 runs on a virtual clock as fast as the CPU allows; time_scale=1 runs in real time,
+    time_scale=60 runs one simulated minute per second, and so on.
+    """
 
-        by_distance = partial(distance, incident=incident)
-        stations_by_distance = sorted(fire_stations, key=by_distance)
+    def __init__(self, stations, skkm=None, incident_interval=0.5, time_scale=0.0, rng=None, log=print,
+                 trace=None, recorder=None, measure_latency=False):
+        self.stations = stations
+        self.station_index = StationIndex(stations)
+        self.capacity = FleetCapacity(stations)
+        self.skkm = skkm
+        self.incident_interval = incident_interval
+        self.time_scale = time_scale
+        self.rng = rng or random
+        self.log = log or (lambda message: None)
+        self.now = 0.0
+        self.events = []
+        self.counter = itertools.count()
+        self.incidents = 0
+        self.unserved = 0
+        self.understaffed = 0
+        self.response_times = []
+        self.dispatched_at = {}
+        self.busy_time = defaultdict(float)
+        # With a trace, incidents come from its (t, Incident) pairs instead of the random generator
+        self.trace = iter(trace) if trace is not None else None
+        self.recorder = recorder
+        self.dispatch_latencies = [] if measure_latency else None
+        if self.trace is None:
+            self.schedule(0.0, INCIDENT)
+        else:
+            self.schedule_next_incident()
+
+    def schedule(self, at, kind, payload=None):
+        heapq.heappush(self.events, (at, next(self.counter), kind, payload))
+
+    def schedule_next_incident(self):
+        if self.trace is None:
+            self.schedule(self.now + self.incident_interval, INCIDENT)
+            return
+        next_incident = next(self.trace, None)
+        if next_incident is not None:
+            self.schedule(next_incident[0], INCIDENT, next_incident[1])
+
+    def run(self, until=None):
+        start_wall = time.monotonic() - self.now / self.time_scale if self.time_scale else 0.0
+        while self.events:
+            at, _, kind, payload = self.events[0]
+            if until is not None and at > until:
+                break
+            heapq.heappop(self.events)
+            if self.time_scale:
+                delay = start_wall + at / self.time_scale - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            self.now = at
+            if kind == INCIDENT:
+                if self.dispatch_latencies is None:
+                    self.handle_incident(payload)
+                else:
+                    start = time.perf_counter()
+                    self.handle_incident(payload)
+                    self.dispatch_latencies.append(time.perf_counter() - start)
+                self.schedule_next_incident()
+            elif kind == ARRIVAL:
+                self.handle_arrival(*payload)
+            else:
+                self.handle_release(payload)
+        self.now = until if until is not None else self.now
+
+    def handle_incident(self, incident=None):
+        if incident is None:
+            incident = generate_random_incident(self.rng)
+        if self.recorder is not None:
+            self.recorder.append(self.now, incident)
+        self.incidents += 1
+        self.log(f"Nowe zdarzenie '{incident.category}' w ({incident.width}, {incident.height})")
+
+        if self.skkm is not None:
+            self.skkm.notify_all({"type": incident.category, "width": incident.width, "height": incident.height})
 
         if incident.category == "PZ":
             vehicles_needed = 3
@@ -155,33 +421,313 @@ def simulate_continuous():
 
         dispatched_vehicles = []
 
-        for station in stations_by_distance:
+        # With the whole fleet busy there is no point in searching the stations
+        if self.capacity.free:
+            stations = self.station_index.nearest(incident.width, incident.height, FireStation.has_free_vehicles)
+        else:
+            stations = ()
+        for station in stations:
             if len(dispatched_vehicles) >= vehicles_needed:
                 break
             dispatched_vehicles += station.dispatch_vehicles(vehicles_needed - len(dispatched_vehicles))
 
-        if dispatched_vehicles:
-            print(f"Przydzielono {len(dispatched_vehicles)} pojazdy:")
-            for vehicle in dispatched_vehicles:
-                    print(f"{vehicle.id}")
-        else:
-            print("Brak pojazdów do przydzielenia")
+        if not dispatched_vehicles:
+            self.unserved += 1
+            self.log("Brak pojazdów do przydzielenia")
+            return
 
-        response_time = random.uniform(0, 3)
-        false_alarm = random.random() < 0.05
+        if len(dispatched_vehicles) < vehicles_needed:
+            self.understaffed += 1
+        self.log(f"Przydzielono {len(dispatched_vehicles)} pojazdy:")
+        for vehicle in dispatched_vehicles:
+            self.dispatched_at[vehicle] = self.now
+            self.log(f"{vehicle.id}")
+
+        response_time = self.rng.uniform(0, 3)
+        false_alarm = self.rng.random() < 0.05
+        self.response_times.append(response_time)
+        self.schedule(self.now + response_time, ARRIVAL, (dispatched_vehicles, response_time, false_alarm))
 
-        print(f"Dojechano na miejsce zdarzenia po {response_time:.2f}s")
+    def handle_arrival(self, vehicles, response_time, false_alarm):
+        self.log(f"Dojechano na miejsce zdarzenia po {response_time:.2f}s")
 
+        # A false alarm sends the vehicles back straight away
         if false_alarm:
-            print("Alarm okazał się fałszywy")
+            self.log("Alarm okazał się fałszywy")
+            action_time = 0.0
         else:
-            action_time = random.uniform(5, 25)
-            print(f"Działania trwały {action_time:.2f}s")
+            action_time = self.rng.uniform(5, 25)
+            self.log(f"Działania trwały {action_time:.2f}s")
+
+        self.schedule(self.now + action_time, RELEASE, vehicles)
+
+    def handle_release(self, vehicles):
+        for vehicle in vehicles:
+            vehicle.station.release_vehicle(vehicle)
+            self.busy_time[vehicle.station.name] += self.now - self.dispatched_at.pop(vehicle)
+            self.log(f"Pojazd {vehicle.id} jest już wolny")
+
+    def utilization(self):
+        """Share of each station's vehicle-time spent out on incidents up to the current time."""
+        busy_time = defaultdict(float, self.busy_time)
+        for vehicle, dispatched_at in self.dispatched_at.items():
+            busy_time[vehicle.station.name] += self.now - dispatched_at
+        return {
+            station.name: busy_time[station.name] / (len(station.vehicles) * self.now) if self.now else 0.0
+            for station in self.stations
+        }
+
+
+# Monte Carlo replications
+def run_replication(seed, horizon, incident_interval=0.5):
+    simulation = DispatchSimulation(create_fire_stations(), incident_interval=incident_interval,
+                                    rng=random.Random(seed), log=None)
+    simulation.run(until=horizon)
+    response_times = sorted(simulation.response_times)
+    metrics = {
+        "incidents": simulation.incidents,
+        "unserved": simulation.unserved,
+        "unserved_share": simulation.unserved / simulation.incidents if simulation.incidents else 0.0,
+        "understaffed": simulation.understaffed,
+        "response_mean": statistics.fmean(response_times) if response_times else 0.0,
+        "response_p90": response_times[int(0.9 * (len(response_times) - 1))] if response_times else 0.0,
+    }
+    for name, share in simulation.utilization().items():
+        metrics[f"utilization {name}"] = share
+    return metrics
+
+
+# Two-sided 95% Student-t quantiles by degrees of freedom; between entries the smaller df (wider interval) is used
+T_QUANTILES_95 = {
+    1: 12.706, 2: 4.303, 3: 3.182, 4: 2.776, 5: 2.571, 6: 2.447, 7: 2.365, 8: 2.306, 9: 2.262, 10: 2.228,
+    11: 2.201, 12: 2.179, 13: 2.160, 14: 2.145, 15: 2.131, 16: 2.120, 17: 2.110, 18: 2.101, 19: 2.093, 20: 2.086,
+    21: 2.080, 22: 2.074, 23: 2.069, 24: 2.064, 25: 2.060, 26: 2.056, 27: 2.052, 28: 2.048, 29: 2.045, 30: 2.042,
+    40: 2.021, 60: 2.000, 120: 1.980,
+}
+
+
+def t_quantile_95(df):
+    if df > 120:
+        return statistics.NormalDist().inv_cdf(0.975)
+    return T_QUANTILES_95[max(k for k in T_QUANTILES_95 if k <= df)]
+
+
+def confidence_interval(values):
+    mean = statistics.fmean(values)
+    if len(values) < 2:
+        return mean, 0.0
+    return mean, t_quantile_95(len(values) - 1) * statistics.stdev(values) / math.sqrt(len(values))
+
+
+def run_replications(replications, horizon, incident_interval=0.5, seed=0, workers=None):
+    """Runs seeded, independent replications across a process pool; returns {metric: (mean, half-width of 95% CI)}."""
+    if replications < 1:
+        raise ValueError("Liczba powtórzeń musi być dodatnia")
+    seeds = [seed + i for i in range(replications)]
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        results = list(executor.map(run_replication, seeds, itertools.repeat(horizon),
+                                    itertools.repeat(incident_interval), chunksize=max(1, replications // 64)))
+    return {metric: confidence_interval([result[metric] for result in results]) for metric in results[0]}
+
+
+# Incident traces
+TRACE_MAGIC = b"FIRETRC1"
+TRACE_DTYPE = np.dtype([("t", "<f8"), ("category", "u1"), ("lat", "<f8"), ("lon", "<f8")])
+CATEGORY_CODES = {category: code for code, category in enumerate(INCIDENT_TYPES)}
+
+
+class TraceRecorder:
+    """Writes incidents as fixed-size binary records, buffered and written in blocks.
+
+    A new recorder starts the file afresh. With append=True it continues an existing trace,
+    shifting timestamps past its last incident so the trace stays in time order.
+    """
+
+    def __init__(self, filename="incidents.trace", buffer_size=65536, append=False):
+        self.t_offset = 0.0
+        if append and os.path.exists(filename) and os.path.getsize(filename) > 0:
+            records = open_trace(filename)
+            if len(records):
+                self.t_offset = float(records["t"][-1])
+            # A torn last record would misalign everything written after it
+            size = len(TRACE_MAGIC) + len(records) * TRACE_DTYPE.itemsize
+            del records
+            os.truncate(filename, size)
+            self.file = open(filename, "ab")
+        else:
+            self.file = open(filename, "wb")
+            self.file.write(TRACE_MAGIC)
+        self.buffer = []
+        self.buffer_size = buffer_size
+
+    def append(self, t, incident):
+        self.buffer.append((t + self.t_offset, CATEGORY_CODES[incident.category], incident.width, incident.height))
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def write_records(self, records):
+        self.flush()
+        records = np.array(records, dtype=TRACE_DTYPE)
+        records["t"] += self.t_offset
+        self.file.write(records.tobytes())
+
+    def flush(self):
+        if self.buffer:
+            self.file.write(np.array(self.buffer, dtype=TRACE_DTYPE).tobytes())
+            self.buffer = []
+        self.file.flush()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+    def __enter__(self):
+        return self
 
-        action_end_time = current_time + action_time
-        for vehicle in dispatched_vehicles:
-            busy_vehicles.append((vehicle, action_end_time))
+    def __exit__(self, *exc):
+        self.close()
+
+
+def generate_trace(filename, count, incident_interval=0.5, seed=0, chunk_size=1_000_000):
+    """Writes count random incidents sampled with NumPy in chunks, matching generate_random_incident."""
+    rng = np.random.default_rng(seed)
+    with TraceRecorder(filename) as recorder:
+        for start in range(0, count, chunk_size):
+            n = min(chunk_size, count - start)
+            records = np.empty(n, dtype=TRACE_DTYPE)
+            records["t"] = (start + np.arange(n)) * incident_interval
+            records["category"] = rng.choice(len(INCIDENT_TYPES), n, p=INCIDENT_PROBABILITIES)
+            records["lat"] = rng.uniform(LAT_MIN, LAT_MAX, n)
+            records["lon"] = rng.uniform(LON_MIN, LON_MAX, n)
+            recorder.write_records(records)
+
+
+def open_trace(filename="incidents.trace"):
+    """Maps the trace into memory without reading it; a truncated last record is ignored."""
+    with open(filename, "rb") as file:
+        if file.read(len(TRACE_MAGIC)) != TRACE_MAGIC:
+            raise ValueError(f"Plik {filename} nie jest zapisem zdarzeń")
+    count = (os.path.getsize(filename) - len(TRACE_MAGIC)) // TRACE_DTYPE.itemsize
+    if count == 0:
+        return np.empty(0, dtype=TRACE_DTYPE)
+    return np.memmap(filename, dtype=TRACE_DTYPE, mode="r", offset=len(TRACE_MAGIC), shape=(count,))
+
+
+def iter_trace(records, chunk_size=65536):
+    # Converting one chunk at a time keeps memory flat and avoids per-record NumPy scalars.
+    # Replay schedules incidents in file order, so each chunk is checked for time order as it is read.
+    last_t = -math.inf
+    for start in range(0, len(records), chunk_size):
+        chunk = records[start:start + chunk_size]
+        times = chunk["t"]
+        if times[0] < last_t or np.any(times[1:] < times[:-1]):
+            raise ValueError("Zdarzenia w śladzie nie są uporządkowane w czasie")
+        last_t = times[-1]
+        for t, category, lat, lon in chunk.tolist():
+            yield t, Incident(INCIDENT_TYPES[category], lat, lon)
+
+
+def benchmark_trace(filename, seed=0):
+    records = open_trace(filename)
+    simulation = DispatchSimulation(create_fire_stations(), rng=random.Random(seed), log=None, trace=iter_trace(records),
+                                    measure_latency=True)
+    start = time.perf_counter()
+    simulation.run()
+    elapsed = time.perf_counter() - start
+    if not simulation.incidents:
+        print(f"Plik {filename} nie zawiera zdarzeń")
+        return
+    latencies = np.array(simulation.dispatch_latencies) * 1e6
+    print(f"{simulation.incidents} zdarzeń w {elapsed:.2f}s: {simulation.incidents / elapsed:.0f} zdarzeń/s, "
+          f"bez pojazdów: {simulation.unserved}")
+    p50, p90, p99, p999 = np.percentile(latencies, [50, 90, 99, 99.9])
+    print(f"Czas przydziału [µs]: p50 {p50:.1f}, p90 {p90:.1f}, p99 {p99:.1f}, p99.9 {p999:.1f}, max {latencies.max():.1f}")
+
+
+def simulate_continuous(notify_radius_km=None):
+    bus = NotificationBus()
+    skkm = SKKM(bus)
+    fire_stations = create_fire_stations()
 
-        time.sleep(0.5)
+    fire_station_iterator = FireStationIterator(fire_stations)
 
-simulate_continuous()
+    for station in fire_station_iterator: 
+        skkm.add_observer(station, radius_km=notify_radius_km)
+
+    try:
+        DispatchSimulation(fire_stations, skkm, time_scale=1.0, log=bus.log).run()
+    finally:
+        bus.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Symulacja dysponowania pojazdów straży pożarnej")
+    parser.add_argument("--horizon", type=float, default=None,
+                        help="czas symulacji w sekundach; bez niego symulacja trwa w nieskończoność w czasie rzeczywistym")
+    parser.add_argument("--time-scale", type=float, default=0.0,
+                        help="ile sekund symulacji na sekundę zegara (0 = tak szybko, jak się da)")
+    parser.add_argument("--incident-interval", type=float, default=0.5, help="odstęp między zdarzeniami w sekundach")
+    parser.add_argument("--notify-radius", type=float, default=None,
+                        help="powiadamiaj tylko jednostki w tym promieniu od zdarzenia (km)")
+    parser.add_argument("--replications", type=int, default=0,
+                        help="liczba niezależnych powtórzeń Monte Carlo (wymaga --horizon), liczonych w puli procesów")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="ziarno generowanego śladu, odtwarzania --replay-trace i pierwszego powtórzenia; "
+                             "kolejne powtórzenia dostają seed+1, seed+2, ...")
+    parser.add_argument("--workers", type=int, default=None, help="liczba procesów (domyślnie wszystkie rdzenie)")
+    parser.add_argument("--record-trace", metavar="PLIK", help="zapisz zdarzenia z przebiegu --horizon do pliku śladu")
+    parser.add_argument("--append", action="store_true", help="dopisz zdarzenia do istniejącego pliku --record-trace")
+    parser.add_argument("--generate-trace", metavar="PLIK", help="wygeneruj losowy ślad --count zdarzeń")
+    parser.add_argument("--count", type=int, default=1_000_000, help="liczba zdarzeń w generowanym śladzie")
+    parser.add_argument("--replay-trace", metavar="PLIK",
+                        help="przepuść ślad przez dysponowanie i podaj przepustowość oraz percentyle czasu przydziału")
+    parser.add_argument("--quiet", action="store_true", help="nie wypisuj przebiegu, tylko podsumowanie")
+    args = parser.parse_args()
+
+    if args.generate_trace:
+        start = time.perf_counter()
+        generate_trace(args.generate_trace, args.count, args.incident_interval, args.seed)
+        print(f"Zapisano {args.count} zdarzeń do pliku {args.generate_trace} w {time.perf_counter() - start:.2f}s")
+        return
+    if args.replay_trace:
+        benchmark_trace(args.replay_trace, args.seed)
+        return
+    if args.replications < 0:
+        parser.error("--replications nie może być ujemne")
+    if args.replications and args.horizon is None:
+        parser.error("--replications wymaga --horizon")
+    if args.horizon is None:
+        simulate_continuous(args.notify_radius)
+        return
+    if args.replications:
+        start = time.perf_counter()
+        summary = run_replications(args.replications, args.horizon, args.incident_interval, args.seed, args.workers)
+        elapsed = time.perf_counter() - start
+        print(f"{args.replications} powtórzeń po {args.horizon:.0f}s w {elapsed:.2f}s, średnia ± połowa 95% przedziału ufności:")
+        for metric, (mean, half_width) in summary.items():
+            print(f"{metric:<28} {mean:12.4f} ± {half_width:.4f}")
+        return
+
+    skkm = bus = None
+    fire_stations = create_fire_stations()
+    if not args.quiet:
+        bus = NotificationBus()
+        skkm = SKKM(bus)
+        for station in FireStationIterator(fire_stations):
+            skkm.add_observer(station, radius_km=args.notify_radius)
+    recorder = TraceRecorder(args.record_trace, append=args.append) if args.record_trace else None
+    simulation = DispatchSimulation(fire_stations, skkm, args.incident_interval, args.time_scale,
+                                    log=None if args.quiet else bus.log, recorder=recorder)
+    start = time.perf_counter()
+    simulation.run(until=args.horizon)
+    elapsed = time.perf_counter() - start
+    if recorder is not None:
+        recorder.close()
+    if bus is not None:
+        bus.close()
+    print(f"Zdarzenia: {simulation.incidents}, bez pojazdów: {simulation.unserved}, "
+          f"czas symulacji {args.horizon:.0f}s policzony w {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
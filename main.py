@@ -1,8 +1,24 @@
+import argparse
+import asyncio
+import json
+import math
+import random
+import sqlite3
+import sys
+import threading
+import time
+import tracemalloc
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
 import xml.etree.ElementTree as ET
 from abc import ABC, abstractmethod
 import requests
+from requests.adapters import HTTPAdapter
 
 class IRate:
+    __slots__ = ()
+
     def getName(self):
         pass
 
@@ -26,6 +42,23 @@ class Rate(IRate):
     
     def getRate(self):
         return self._rate
+
+class CompactRate(IRate):
+    __slots__ = ('_name', '_code', '_rate')
+
+    def __init__(self, name, code, rate):
+        self._name = sys.intern(name)
+        self._code = sys.intern(code)
+        self._rate = float(rate)
+
+    def getName(self):
+        return self._name
+
+    def getCode(self):
+        return self._code
+
+    def getRate(self):
+        return self._rate
     
 class IRateCollection(ABC):
     @abstractmethod
@@ -36,55 +69,402 @@ class IRateCollection(ABC):
     def findRate(self, code):
         pass
 
+    @abstractmethod
+    def replaceRates(self, rates):
+        pass
+
+class RateTable:
+    def __init__(self, rates, previous=None):
+        self.rates = {}
+        for rate in rates:
+            self.rates.setdefault(rate.getCode(), rate)
+
+        # Przy tym samym zestawie walut zachowujemy kolejność poprzedniej tabeli,
+        # żeby móc przeliczyć tylko wiersze i kolumny walut, których kurs się zmienił
+        if previous is not None and previous.index.keys() == self.rates.keys():
+            self.codes = previous.codes
+            self.index = previous.index
+        else:
+            previous = None
+            self.codes = list(self.rates)
+            self.index = {code: i for i, code in enumerate(self.codes)}
+
+        self.mids = [float(self.rates[code].getRate()) for code in self.codes]
+
+        if previous is None:
+            self.matrix = [[baseRate / targetRate for targetRate in self.mids] for baseRate in self.mids]
+        else:
+            self.matrix = self._updateMatrix(previous)
+
+    def _updateMatrix(self, previous):
+        changed = [i for i, (old, new) in enumerate(zip(previous.mids, self.mids)) if old != new]
+        if not changed:
+            return previous.matrix
+
+        changedRows = set(changed)
+        matrix = []
+        for i, baseRate in enumerate(self.mids):
+            if i in changedRows:
+                row = [baseRate / targetRate for targetRate in self.mids]
+            else:
+                row = previous.matrix[i].copy()
+                for j in changed:
+                    row[j] = baseRate / self.mids[j]
+            matrix.append(row)
+        return matrix
+
+    def withRate(self, rate):
+        # Nowa waluta to jeden nowy wiersz i jedna nowa kolumna, czyli O(N) zamiast przebudowy całej macierzy.
+        # Kolumna dopisywana jest na końcu współdzielonych wierszy; starsze tabele jej nie widzą,
+        # bo ich codes i index kończą się przed nią.
+        code = rate.getCode()
+        if code in self.rates:
+            return self
+        table = RateTable.__new__(RateTable)
+        table.rates = dict(self.rates)
+        table.rates[code] = rate
+        table.codes = self.codes + [code]
+        table.index = dict(self.index)
+        table.index[code] = len(self.codes)
+        mid = float(rate.getRate())
+        table.mids = self.mids + [mid]
+        for row, baseRate in zip(self.matrix, self.mids):
+            row.append(baseRate / mid)
+        table.matrix = self.matrix + [[mid / targetRate for targetRate in table.mids]]
+        return table
+
+    def crossRate(self, base, target):
+        return self.matrix[self.index[base]][self.index[target]]
+
+    def ratesFor(self, base):
+        return dict(zip(self.codes, self.matrix[self.index[base]]))
+
 class RateCollection(IRateCollection):
     _instance = None
 
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(RateCollection, cls).__new__(cls)
-            cls._instance._rates = []
+            cls._instance._table = RateTable([])
+            cls._instance._lock = threading.Lock()
         return cls._instance 
     
     def addRate(self, rate):
-        self._rates.append(rate)
+        with self._lock:
+            self._table = self._table.withRate(rate)
 
     def findRate(self, code):
-        for rate in self._rates:
-            if rate.getCode() == code:
-                return rate 
-        return None
+        return self._table.rates.get(code)
+
+    def replaceRates(self, rates):
+        # Nowa tabela budowana jest obok bieżącej i podmieniana jednym przypisaniem,
+        # więc czytelnicy w innych wątkach widzą zawsze kompletną tabelę.
+        with self._lock:
+            self._table = RateTable(rates, self._table)
+
+    def snapshot(self):
+        return self._table
+
+    def crossRate(self, base, target):
+        return self._table.crossRate(base, target)
+
+    def ratesFor(self, base):
+        return self._table.ratesFor(base)
+
+class AsyncRateFetcher:
+    def __init__(self, baseUrl='https://api.nbp.pl/api/exchangerates/tables/', timeout=5.0, retries=3, backoff=0.5, poolSize=3):
+        self.baseUrl = baseUrl
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self._session = requests.Session()
+        self._session.headers['Accept'] = 'application/json'
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=poolSize)
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+        # url -> (ETag, Last-Modified, dane) z ostatniej udanej odpowiedzi
+        self._cache = {}
+
+    async def fetch(self, url, allowMissing=False):
+        cached = self._cache.get(url)
+        headers = {}
+        if cached is not None:
+            etag, lastModified, _ = cached
+            if etag:
+                headers['If-None-Match'] = etag
+            if lastModified:
+                headers['If-Modified-Since'] = lastModified
+
+        for attempt in range(self.retries + 1):
+            try:
+                response = await asyncio.to_thread(self._session.get, url, headers=headers, timeout=self.timeout)
+            except requests.RequestException:
+                if attempt == self.retries:
+                    raise
+            else:
+                if response.status_code == 304 and cached is not None:
+                    return cached[2], False
+                # NBP zwraca 404, gdy w zadanym okresie nie opublikowano żadnej tabeli
+                if response.status_code == 404 and allowMissing:
+                    return [], False
+                if response.status_code == 200:
+                    data = response.json()
+                    self._cache[url] = (response.headers.get('ETag'), response.headers.get('Last-Modified'), data)
+                    return data, True
+                if (response.status_code < 500 and response.status_code != 429) or attempt == self.retries:
+                    raise Exception(f"Failed to fetch data ({response.status_code})")
+            await asyncio.sleep(self.backoff * 2 ** attempt)
+
+    async def fetchTables(self, tables=('a', 'b', 'c')):
+        results = await asyncio.gather(*(self.fetch(f'{self.baseUrl}{table}/') for table in tables))
+        changed = any(modified for _, modified in results)
+        return {table: data for table, (data, _) in zip(tables, results)}, changed
+
+    async def fetchRange(self, table, start, end):
+        # API NBP przyjmuje zakresy dat nie dłuższe niż 93 dni
+        chunks = []
+        chunkStart = start
+        while chunkStart <= end:
+            chunkEnd = min(chunkStart + timedelta(days=92), end)
+            chunks.append((chunkStart, chunkEnd))
+            chunkStart = chunkEnd + timedelta(days=1)
+
+        results = await asyncio.gather(*(
+            self.fetch(f'{self.baseUrl}{table}/{chunkStart.isoformat()}/{chunkEnd.isoformat()}/', allowMissing=True)
+            for chunkStart, chunkEnd in chunks
+        ))
+        return [item for data, _ in results for item in data]
+
+    def close(self):
+        self._session.close()
+
+class RateHistory:
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(RateHistory, cls).__new__(cls)
+            # kod waluty -> posortowane daty (jako ordinal) i odpowiadające im kursy średnie
+            cls._instance._dates = {}
+            cls._instance._mids = {}
+            cls._instance._names = {}
+            cls._instance._lock = threading.Lock()
+        return cls._instance
 
-class Data:
     @staticmethod
-    def extractDataFromAPI(url):
-        response = requests.get(url)
-        if response.status_code == 200:
-            return response.json()
+    def _ordinal(day):
+        if isinstance(day, str):
+            day = date.fromisoformat(day)
+        return day.toordinal()
+
+    def ingest(self, tables):
+        batch = {}
+        for table in tables:
+            day = self._ordinal(table['effectiveDate'])
+            for item in table['rates']:
+                if 'mid' not in item:
+                    continue
+                self._names.setdefault(item['code'], item['currency'])
+                batch.setdefault(item['code'], {})[day] = item['mid']
+
+        with self._lock:
+            for code, points in batch.items():
+                self._merge(code, points)
+
+    def _merge(self, code, points):
+        # Tablice są zastępowane nowymi, a nie rozszerzane w miejscu,
+        # więc wycinki zwrócone wcześniej przez getRange pozostają ważne
+        dates = self._dates.get(code, array('l'))
+        mids = self._mids.get(code, array('d'))
+        newDates = sorted(points)
+
+        if not dates or newDates[0] > dates[-1]:
+            self._dates[code] = dates + array('l', newDates)
+            self._mids[code] = mids + array('d', (points[day] for day in newDates))
         else:
-            raise Exception("Failed to fetch data")
+            merged = dict(zip(dates, mids))
+            merged.update(points)
+            mergedDates = sorted(merged)
+            self._dates[code] = array('l', mergedDates)
+            self._mids[code] = array('d', (merged[day] for day in mergedDates))
+
+    def getCodes(self):
+        return list(self._dates)
+
+    def asOf(self, code, day):
+        if code == 'PLN':
+            return 1.0
+        dates = self._dates[code]
+        position = bisect_right(dates, self._ordinal(day)) - 1
+        if position < 0:
+            raise KeyError(f'Brak kursu {code} na dzień {day}')
+        return self._mids[code][position]
+
+    def firstDate(self, code):
+        if code == 'PLN':
+            return None
+        return date.fromordinal(self._dates[code][0])
+
+    def getRange(self, code, start, end):
+        dates = self._dates[code]
+        mids = self._mids[code]
+        lo = bisect_left(dates, self._ordinal(start))
+        hi = bisect_right(dates, self._ordinal(end))
+        return memoryview(dates)[lo:hi], memoryview(mids)[lo:hi]
+
+    def getRangeAll(self, start, end):
+        return {code: self.getRange(code, start, end) for code in self.getCodes()}
+
+class RateCache:
+    def __init__(self, path='rates_cache.sqlite'):
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._connection:
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS snapshots ('
+                'tableName TEXT, effectiveDate TEXT, fetchedAt REAL, '
+                'PRIMARY KEY (tableName, effectiveDate))'
+            )
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS rates ('
+                'tableName TEXT, effectiveDate TEXT, code TEXT, currency TEXT, mid REAL, '
+                'PRIMARY KEY (tableName, effectiveDate, code)) WITHOUT ROWID'
+            )
+
+    def save(self, tables, fetchedAt=None):
+        fetchedAt = time.time() if fetchedAt is None else fetchedAt
+        with self._lock, self._connection:
+            for data in tables.values():
+                table = data[0]
+                rows = [
+                    (table['table'], table['effectiveDate'], item['code'], item['currency'], item['mid'])
+                    for item in table['rates'] if 'mid' in item
+                ]
+                if not rows:
+                    continue
+                self._connection.execute(
+                    'INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?)',
+                    (table['table'], table['effectiveDate'], fetchedAt)
+                )
+                self._connection.executemany('INSERT OR REPLACE INTO rates VALUES (?, ?, ?, ?, ?)', rows)
+
+    def load(self):
+        # Zwraca najnowsze zapisane tabele w formacie odpowiedzi NBP oraz czas najstarszego pobrania
+        with self._lock:
+            snapshots = self._connection.execute(
+                'SELECT tableName, MAX(effectiveDate), fetchedAt FROM snapshots GROUP BY tableName ORDER BY tableName'
+            ).fetchall()
+            tables = {}
+            for tableName, effectiveDate, _ in snapshots:
+                rows = self._connection.execute(
+                    'SELECT currency, code, mid FROM rates WHERE tableName = ? AND effectiveDate = ?',
+                    (tableName, effectiveDate)
+                ).fetchall()
+                tables[tableName.lower()] = [{
+                    'table': tableName,
+                    'effectiveDate': effectiveDate,
+                    'rates': [{'currency': currency, 'code': code, 'mid': mid} for currency, code, mid in rows],
+                }]
+        fetchedAt = min((snapshot[2] for snapshot in snapshots), default=None)
+        return tables, fetchedAt
+
+    def close(self):
+        self._connection.close()
 
 class Parser:
+    rateClass = Rate
+
+    def __init__(self, rateClass=None):
+        if rateClass is not None:
+            self.rateClass = rateClass
+
     def parseData(self, data):
-        for item in data[0]['rates']:
-            name = item['currency']
-            code = item['code']
-            rate = item['mid']
-            newRate = Rate(name, code, rate)
-            database = RateCollection()
-            database.addRate(newRate)
-        database.addRate(Rate('zloty', 'PLN', 1.0))
+        self.parseTables([data])
+
+    def parseTables(self, tables):
+        rates = []
+        for data in tables:
+            for item in data[0]['rates']:
+                # Tabela C zawiera tylko kursy kupna i sprzedaży, bez kursu średniego
+                if 'mid' not in item:
+                    continue
+                name = item['currency']
+                code = item['code']
+                rate = item['mid']
+                rates.append(self.rateClass(name, code, rate))
+        rates.append(self.rateClass('zloty', 'PLN', 1.0))
+        database = RateCollection()
+        database.replaceRates(rates)
+
+async def refreshRates(fetcher, cache=None):
+    tables, changed = await fetcher.fetchTables()
+    # Przebudowa macierzy i zapis do SQLite idą w osobnym wątku, żeby nie wstrzymywać pętli zdarzeń serwera
+    if changed:
+        await asyncio.to_thread(Parser().parseTables, tables.values())
+    if cache is not None:
+        await asyncio.to_thread(cache.save, tables)
+    return changed
+
+def refreshInBackground(fetcher, cache=None):
+    def refresh():
+        try:
+            asyncio.run(refreshRates(fetcher, cache))
+        except Exception as e:
+            print(f'Nie udało się odświeżyć kursów: {e}')
+
+    thread = threading.Thread(target=refresh, daemon=True)
+    thread.start()
+    return thread
+
+def loadRates(fetcher, cache, maxAge):
+    tables, fetchedAt = cache.load()
+    if tables and time.time() - fetchedAt <= maxAge:
+        Parser().parseTables(tables.values())
+        refreshInBackground(fetcher, cache)
+        return
+
+    try:
+        asyncio.run(refreshRates(fetcher, cache))
+    except Exception as e:
+        if not tables:
+            raise
+        print(f'Nie udało się pobrać kursów ({e}), używam zapisanych z {time.ctime(fetchedAt)}')
+        Parser().parseTables(tables.values())
 
 class Exchange:
     def Exchanger(self, base, target, amount):
-        rates_database = RateCollection()
+        rates_database = RateCollection().snapshot()
+        return round(amount * rates_database.crossRate(base, target), 2)
+
+    def batchExchanger(self, bases, targets, amounts):
+        rates_database = RateCollection().snapshot()
+        pairs = list(zip(bases, targets))
+        crossRates = {pair: rates_database.crossRate(*pair) for pair in set(pairs)}
+
+        # float() sprowadza np. wartości numpy do typu float, żeby round dawał te same wyniki co Exchanger
+        return [round(float(amount) * crossRates[pair], 2) for pair, amount in zip(pairs, amounts)]
+
+    def historicalExchanger(self, base, target, amount, day):
+        history = RateHistory()
+        return round(amount * (history.asOf(base, day) / history.asOf(target, day)), 2)
 
-        baseElement = rates_database.findRate(base)
-        baseRate = float(baseElement.getRate())
-        
-        targetElement = rates_database.findRate(target)
-        targetRate = float(targetElement.getRate())
+    def revaluation(self, base, target, amount, start, end):
+        history = RateHistory()
+        days = set()
+        for code in (base, target):
+            if code != 'PLN':
+                days.update(history.getRange(code, start, end)[0])
 
-        return round(amount * (baseRate / targetRate), 2)
+        # Szereg zaczyna się od pierwszego dnia, w którym obie waluty mają już kurs
+        firstDates = [history.firstDate(code) for code in (base, target) if code != 'PLN']
+        firstDay = max(firstDates).toordinal() if firstDates else 0
+
+        result = []
+        for day in sorted(d for d in days if d >= firstDay):
+            day = date.fromordinal(day)
+            result.append((day, round(amount * (history.asOf(base, day) / history.asOf(target, day)), 2)))
+        return result
     
 class Interface:
     def displayInterface(self):
@@ -114,7 +494,181 @@ class Interface:
             exchangedAmount = Exchanger.Exchanger(baseRate.getCode(), targetRate.getCode(), amount)
             print(f'Przewalutowano {amount} {baseRate.getCode()} na {exchangedAmount} {targetRate.getCode()}')
 
-url = 'https://api.nbp.pl/api/exchangerates/tables/a/'
-data = Data.extractDataFromAPI(url)
-Parser().parseData(data)
-Interface().displayInterface()
+class ConversionServer:
+    # Protokół: jedno żądanie JSON na linię, np. {"base": "EUR", "target": "USD", "amount": 10}
+    # albo {"batch": [["EUR", "USD", 10], ["USD", "PLN", 2.5]]}; odpowiedź to jedna linia JSON.
+    # Domyślny limit linii StreamReadera (64 KiB) mieści tylko ok. 2,5 tys. przeliczeń w jednym żądaniu
+    maxRequestBytes = 16 * 2 ** 20
+
+    def __init__(self, fetcher, cache=None, refreshInterval=3600.0):
+        self.fetcher = fetcher
+        self.cache = cache
+        self.refreshInterval = refreshInterval
+        self.exchange = Exchange()
+
+    def handleRequest(self, line):
+        try:
+            request = json.loads(line)
+            if 'batch' in request:
+                bases, targets, amounts = zip(*request['batch']) if request['batch'] else ((), (), ())
+                response = {'amounts': self.exchange.batchExchanger(bases, targets, self.checkAmounts(amounts))}
+            else:
+                amount, = self.checkAmounts([request['amount']])
+                response = {'amount': self.exchange.Exchanger(request['base'], request['target'], amount)}
+        except KeyError as e:
+            response = {'error': f'Nieznana waluta lub brak pola: {e}'}
+        except (ValueError, TypeError) as e:
+            response = {'error': f'Błędne żądanie: {e}'}
+        return json.dumps(response).encode() + b'\n'
+
+    @staticmethod
+    def checkAmounts(amounts):
+        # float() przyjmuje "nan" i "inf", a takich wartości nie da się odesłać jako poprawny JSON
+        amounts = [float(amount) for amount in amounts]
+        if not all(math.isfinite(amount) for amount in amounts):
+            raise ValueError('kwota musi być skończoną liczbą')
+        return amounts
+
+    @staticmethod
+    async def skipLine(reader, consumed):
+        # Odrzuca resztę zbyt długiej linii, tak aby następne żądanie zaczęło się od nowej linii
+        while True:
+            await reader.read(consumed)
+            try:
+                await reader.readuntil(b'\n')
+                return
+            except asyncio.LimitOverrunError as e:
+                consumed = e.consumed
+            except asyncio.IncompleteReadError:
+                return
+
+    async def handleClient(self, reader, writer):
+        try:
+            while True:
+                try:
+                    line = await reader.readuntil(b'\n')
+                except asyncio.IncompleteReadError as e:
+                    line = e.partial
+                except (asyncio.LimitOverrunError, ValueError) as e:
+                    await self.skipLine(reader, getattr(e, 'consumed', 0))
+                    response = {'error': f'Żądanie dłuższe niż {self.maxRequestBytes} bajtów'}
+                    writer.write(json.dumps(response).encode() + b'\n')
+                    await writer.drain()
+                    continue
+                if not line:
+                    break
+                writer.write(self.handleRequest(line))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def refreshPeriodically(self):
+        while True:
+            await asyncio.sleep(self.refreshInterval)
+            try:
+                await refreshRates(self.fetcher, self.cache)
+            except Exception as e:
+                print(f'Nie udało się odświeżyć kursów: {e}')
+
+    async def serve(self, host='127.0.0.1', port=8765):
+        server = await asyncio.start_server(self.handleClient, host, port, limit=self.maxRequestBytes)
+        refreshTask = asyncio.create_task(self.refreshPeriodically())
+        print(f'Serwer przeliczeń nasłuchuje na {host}:{port}')
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            refreshTask.cancel()
+
+async def runLoadGenerator(host, port, codes, connections=32, requestCount=50000, batchSize=1):
+    latencies = []
+
+    async def client(count):
+        reader, writer = await asyncio.open_connection(host, port, limit=ConversionServer.maxRequestBytes)
+        rng = random.Random()
+        for _ in range(count):
+            if batchSize == 1:
+                request = {'base': rng.choice(codes), 'target': rng.choice(codes), 'amount': rng.uniform(1, 1000)}
+            else:
+                request = {'batch': [[rng.choice(codes), rng.choice(codes), rng.uniform(1, 1000)] for _ in range(batchSize)]}
+            line = json.dumps(request).encode() + b'\n'
+            start = time.perf_counter()
+            writer.write(line)
+            await writer.drain()
+            response = await reader.readline()
+            latencies.append(time.perf_counter() - start)
+            if b'error' in response:
+                raise Exception(f'Serwer zwrócił błąd: {response.decode().strip()}')
+        writer.close()
+
+    # Reszta z dzielenia trafia do pierwszych połączeń; połączenia bez żądań nie są otwierane
+    counts = [requestCount // connections + (i < requestCount % connections) for i in range(connections)]
+    start = time.perf_counter()
+    await asyncio.gather(*(client(count) for count in counts if count))
+    elapsed = time.perf_counter() - start
+
+    if not latencies:
+        print('Nie wysłano żadnych żądań')
+        return
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f'{len(latencies)} żądań po {batchSize} przeliczeń przez {sum(1 for count in counts if count)} połączeń w {elapsed:.2f}s')
+    print(f'{len(latencies) * batchSize / elapsed:.0f} przeliczeń/s, {len(latencies) / elapsed:.0f} żądań/s')
+    print(f'opóźnienie p50 {p50 * 1000:.3f} ms, p99 {p99 * 1000:.3f} ms')
+
+def benchmarkRateMemory(count=100000):
+    names = ['dolar amerykański', 'euro', 'frank szwajcarski', 'funt szterling', 'jen (Japonia)']
+    codes = ['USD', 'EUR', 'CHF', 'GBP', 'JPY']
+    for rateClass in (Rate, CompactRate):
+        tracemalloc.start()
+        # Kody i nazwy budowane są od nowa dla każdego kursu, tak jak przy parsowaniu odpowiedzi JSON
+        rates = [
+            rateClass(names[i % 5].encode().decode(), codes[i % 5].encode().decode(), 4.0 + i / count)
+            for i in range(count)
+        ]
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f'{rateClass.__name__}: {size / count:.1f} B na kurs, {size / 2 ** 20:.2f} MiB na {count} kursów')
+        del rates
+
+def main():
+    argParser = argparse.ArgumentParser(description='Przelicznik walut według kursów NBP')
+    argParser.add_argument('--cache', default='rates_cache.sqlite', help='plik z zapisanymi kursami')
+    argParser.add_argument('--max-age', type=float, default=12 * 3600,
+                           help='po ilu sekundach zapisane kursy trzeba pobrać ponownie przed startem')
+    argParser.add_argument('--compact', action='store_true', help='przechowuj kursy w zwartej postaci (CompactRate)')
+    argParser.add_argument('--bench-memory', action='store_true', help='porównaj zużycie pamięci Rate i CompactRate')
+    argParser.add_argument('--serve', action='store_true', help='uruchom serwer przeliczeń zamiast trybu interaktywnego')
+    argParser.add_argument('--load-test', action='store_true', help='obciąż działający serwer przeliczeń i podaj wyniki')
+    argParser.add_argument('--host', default='127.0.0.1')
+    argParser.add_argument('--port', type=int, default=8765)
+    argParser.add_argument('--refresh-interval', type=float, default=3600.0, help='co ile sekund serwer odświeża kursy')
+    argParser.add_argument('--connections', type=int, default=32, help='liczba połączeń generatora obciążenia')
+    argParser.add_argument('--requests', type=int, default=50000, help='liczba żądań generatora obciążenia')
+    argParser.add_argument('--batch-size', type=int, default=1, help='liczba przeliczeń w jednym żądaniu generatora')
+    argParser.add_argument('--codes', default='EUR,USD,CHF,GBP,PLN', help='waluty używane przez generator obciążenia')
+    args = argParser.parse_args()
+
+    if args.bench_memory:
+        benchmarkRateMemory()
+        return
+    if args.load_test:
+        asyncio.run(runLoadGenerator(args.host, args.port, args.codes.split(','),
+                                     args.connections, args.requests, args.batch_size))
+        return
+    if args.compact:
+        Parser.rateClass = CompactRate
+
+    fetcher = AsyncRateFetcher()
+    cache = RateCache(args.cache)
+    loadRates(fetcher, cache, args.max_age)
+    if args.serve:
+        asyncio.run(ConversionServer(fetcher, cache, args.refresh_interval).serve(args.host, args.port))
+    else:
+        Interface().displayInterface()
+
+if __name__ == '__main__':
+    main()